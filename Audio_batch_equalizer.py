@@ -0,0 +1,68 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from Audio_equalizer import EQProcessor, load_eq_preset
+from Audio_wav_io import process_wav
+
+
+def render_file(input_path, output_path, preset, block_size):
+    """
+    Apply one EQ preset to a WAV file, block by block. Returns its duration in seconds.
+
+    The input is memory-mapped (any PCM width, including 24-bit) and the
+    output written as each block is filtered, so a worker holds a few
+    block_size buffers however long the file is: about 4 MiB for stereo at
+    the default block size.
+    """
+    center_freqs, qs, gains = preset
+    return process_wav(input_path, output_path,
+                       lambda sample_rate: EQProcessor(sample_rate, center_freqs, gains, qs), block_size)
+
+
+def render_presets(input_dir, output_dir, preset_paths, workers=None, block_size=65536):
+    """
+    Render every WAV file in input_dir through every preset using a process pool.
+
+    Output goes to output_dir/<preset name>/<file name>. The memory of each
+    worker is bounded by block_size (see render_file()), so the workers are
+    kept for the whole run.
+    Returns (files per second, real-time factor) of the whole run.
+    """
+    wav_files = sorted(name for name in os.listdir(input_dir) if name.lower().endswith('.wav'))
+    tasks = []
+    for preset_path in preset_paths:
+        center_freqs, qs, gains, _ = load_eq_preset(preset_path)
+        preset_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(preset_path))[0])
+        os.makedirs(preset_dir, exist_ok=True)
+        for name in wav_files:
+            tasks.append((os.path.join(input_dir, name), os.path.join(preset_dir, name),
+                          (center_freqs, qs, gains), block_size))
+
+    start = time.perf_counter()
+    audio_seconds = 0.0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(render_file, *task): task for task in tasks}
+        for future in as_completed(futures):
+            audio_seconds += future.result()
+            print(f"Rendered {futures[future][1]}")
+    elapsed = time.perf_counter() - start
+
+    files_per_second = len(tasks) / elapsed
+    real_time_factor = audio_seconds / elapsed
+    print(f"{len(tasks)} files in {elapsed:.2f} s: {files_per_second:.2f} files/s, "
+          f"{real_time_factor:.1f}x real time")
+    return files_per_second, real_time_factor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply EQ presets to a directory of WAV files.")
+    parser.add_argument("input_dir", help="Directory containing the WAV files to process")
+    parser.add_argument("output_dir", help="Directory to write one sub-directory per preset to")
+    parser.add_argument("--preset", action="append", required=True,
+                        help="EQ preset in the EQ_data.csv layout (can be given several times)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--block-size", type=int, default=65536, help="Samples processed per block")
+    args = parser.parse_args()
+
+    render_presets(args.input_dir, args.output_dir, args.preset, args.workers, args.block_size)
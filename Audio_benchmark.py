@@ -0,0 +1,387 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+import numpy as np
+import scipy
+
+from Audio_compressor_and_expander import (BlockDynamicsProcessor, DynamicsProcessor, apply_expander_compressor,
+                                           compress_audio_sine_wave)
+from Audio_equalizer import (BlockEQProcessor, FIREQProcessor, SpectrumAnalyzer, apply_eq_filters,
+                             calculate_eq_response, calculate_spectrum, fit_eq_to_target, load_eq_preset)
+from Specific_band_audio_compressor_and_expander import MultibandCompressor, apply_compression_expansion_frequency
+
+# Sweep used when no option overrides it
+DEFAULT_SECONDS = (0.01, 0.1, 1.0, 10.0, 60.0, 600.0)
+DEFAULT_BANDS = (1, 6, 31)
+DEFAULT_CHANNELS = (1, 2)
+DEFAULT_DTYPES = ('float64', 'float32')
+
+RESULT_FIELDS = ('kernel', 'seconds', 'channels', 'bands', 'dtype', 'repeats', 'best_time',
+                 'samples_per_second', 'realtime_factor', 'peak_memory')
+
+
+def eq_parameters(n_bands):
+    """Return (center_freqs, gains, qs) of n_bands peaking bands spread over the audio range."""
+    center_freqs = np.geomspace(31.25, 16000, n_bands)
+    gains = np.linspace(-6, 6, n_bands)
+    qs = np.full(n_bands, 1.41)
+    return center_freqs, gains, qs
+
+
+def make_eq_filters(signal, sample_rate, n_bands, dtype):
+    center_freqs, gains, qs = eq_parameters(n_bands)
+    return lambda: apply_eq_filters(signal, sample_rate, center_freqs, gains, qs)
+
+
+def make_fir_eq_processor(signal, sample_rate, n_bands, dtype):
+    # Linear-phase alternative to the biquad cascade of apply_eq_filters
+    processor = FIREQProcessor(sample_rate, *eq_parameters(n_bands))
+
+    def run():
+        processor.reset()
+        return processor.process(signal)
+    return run
+
+
+def make_eq_response(signal, sample_rate, n_bands, dtype):
+    # The response is evaluated on the FFT grid of the signal, like the UI overlay
+    freqs = np.fft.rfftfreq(signal.shape[-1], 1 / sample_rate)
+    center_freqs, gains, qs = eq_parameters(n_bands)
+    return lambda: calculate_eq_response(freqs, center_freqs, gains, qs, sample_rate)
+
+
+def make_spectrum(signal, sample_rate, n_bands, dtype):
+    return lambda: calculate_spectrum(signal, sample_rate)
+
+
+def make_spectrum_analyzer(signal, sample_rate, n_bands, dtype):
+    # The 1/24-octave analysis the UIs plot
+    analyzer = SpectrumAnalyzer(sample_rate, bins_per_octave=24)
+    return lambda: analyzer.analyze(signal)
+
+
+def make_sine_compression(signal, sample_rate, n_bands, dtype):
+    frequency = np.full(signal.shape[:-1], 440.0)
+    duration = signal.shape[-1] / sample_rate
+    return lambda: compress_audio_sine_wave(frequency, duration, sample_rate, -10, 4, -40, 2, 1.0)
+
+
+def make_transfer_function(signal, sample_rate, n_bands, dtype):
+    input_db = 20 * np.log10(np.abs(signal) + 1e-10)
+    return lambda: apply_expander_compressor(input_db, -10, 4, -40, 2)
+
+
+def make_band_compression(signal, sample_rate, n_bands, dtype):
+    return lambda: apply_compression_expansion_frequency(signal, sample_rate, -40, -10, 4, 2, (500, 2000),
+                                                         dtype=dtype)
+
+
+def make_dynamics_processor(signal, sample_rate, n_bands, dtype):
+    processor = DynamicsProcessor(sample_rate, -10, 4, -40, 2)
+
+    def run():
+        processor.reset()
+        return processor.process(signal)
+    return run
+
+
+def make_multiband_compressor(signal, sample_rate, n_bands, dtype):
+    crossover_freqs = np.geomspace(100, 10000, n_bands - 1) if n_bands > 1 else []
+    processor = MultibandCompressor(sample_rate, crossover_freqs, -10, 4, -40, 2)
+
+    def run():
+        processor.reset()
+        return processor.process(signal)
+    return run
+
+
+# Kernel name -> (factory, sweep axes besides the length it depends on, longest signal in seconds).
+# Only kernels that compute in float32 when given float32 samples sweep 'dtype'; the
+# others convert to float64 and are run on float64 only. Kernels that keep several
+# whole-signal intermediates are capped so a stereo run stays below about 1 GiB
+# (MultibandCompressor holds every band: ~50 MiB per stereo second at 31 bands).
+KERNELS = {
+    'apply_eq_filters': (make_eq_filters, {'bands', 'channels'}, None),
+    'FIREQProcessor': (make_fir_eq_processor, {'bands', 'channels'}, 60.0),
+    'calculate_eq_response': (make_eq_response, {'bands'}, 10.0),
+    'calculate_spectrum': (make_spectrum, {'channels', 'dtype'}, None),
+    'SpectrumAnalyzer': (make_spectrum_analyzer, {'channels', 'dtype'}, None),
+    'compress_audio_sine_wave': (make_sine_compression, {'channels'}, 60.0),
+    'apply_expander_compressor': (make_transfer_function, {'channels', 'dtype'}, None),
+    'apply_compression_expansion_frequency': (make_band_compression, {'channels', 'dtype'}, 60.0),
+    'DynamicsProcessor': (make_dynamics_processor, {'channels'}, 60.0),
+    'MultibandCompressor': (make_multiband_compressor, {'bands', 'channels'}, 10.0),
+}
+
+
+def make_signal(seconds, channels, dtype, sample_rate):
+    """Return reproducible noise of the given length, (channels x samples) or 1-D for mono."""
+    shape = (channels, int(round(seconds * sample_rate))) if channels > 1 else (int(round(seconds * sample_rate)),)
+    return (np.random.default_rng(0).standard_normal(shape) * 0.1).astype(dtype)
+
+
+def measure(function, min_time=0.5, max_repeats=20):
+    """
+    Time function() and return (repeats, best time in seconds, peak memory in bytes).
+
+    The first call is a warm-up. The function is then repeated until
+    min_time has passed or max_repeats runs were made, and the fastest run
+    is kept. Peak memory is measured with tracemalloc in a separate run, so
+    the tracing overhead does not affect the timings.
+    """
+    function()
+    best, total, repeats = np.inf, 0.0, 0
+    while repeats < max_repeats and (repeats == 0 or total < min_time):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best, total, repeats = min(best, elapsed), total + elapsed, repeats + 1
+
+    tracemalloc.start()
+    function()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return repeats, best, peak_memory
+
+
+def run_benchmarks(kernels=None, seconds=DEFAULT_SECONDS, bands=DEFAULT_BANDS, channels=DEFAULT_CHANNELS,
+                   dtypes=DEFAULT_DTYPES, sample_rate=48000, min_time=0.5):
+    """
+    Run every kernel over the sweep and return a list of result dicts.
+
+    Sweep axes a kernel does not depend on are not repeated for it.
+    samples_per_second counts the samples of all channels, realtime_factor
+    is the signal duration divided by the best run time.
+    """
+    results = []
+    for name in kernels or KERNELS:
+        make_kernel, axes, max_seconds = KERNELS[name]
+        for length, n_channels, n_bands, dtype in itertools.product(
+                seconds, channels if 'channels' in axes else (1,), bands if 'bands' in axes else (None,),
+                dtypes if 'dtype' in axes else ('float64',)):
+            if max_seconds is not None and length > max_seconds:
+                continue
+            signal = make_signal(length, n_channels, dtype, sample_rate)
+            repeats, best, peak_memory = measure(make_kernel(signal, sample_rate, n_bands, np.dtype(dtype).type),
+                                                 min_time)
+            result = {'kernel': name, 'seconds': length, 'channels': n_channels, 'bands': n_bands, 'dtype': dtype,
+                      'repeats': repeats, 'best_time': best, 'samples_per_second': signal.size / best,
+                      'realtime_factor': length / best, 'peak_memory': peak_memory}
+            results.append(result)
+            print(f"{name:>38} {length:8.2f} s {n_channels} ch {n_bands or '-':>3} bands {dtype:>7}: "
+                  f"{result['samples_per_second'] / 1e6:9.2f} Msamples/s {result['realtime_factor']:10.1f}x "
+                  f"{peak_memory / 2 ** 20:9.1f} MiB")
+            del signal
+    return results
+
+
+# Block processor name -> factory(sample_rate, block_size, channels) for the callback check
+CALLBACK_PROCESSORS = {
+    'BlockEQProcessor': lambda sample_rate, block_size, channels: BlockEQProcessor(
+        sample_rate, *eq_parameters(10), block_size, channels),
+    'BlockDynamicsProcessor': lambda sample_rate, block_size, channels: BlockDynamicsProcessor(
+        sample_rate, -10, 4, -40, 2, block_size, channels),
+}
+
+
+def check_callback_allocations(make_processor, block_sizes=(64, 128, 256, 512), channels=2, blocks=500,
+                               sample_rate=48000):
+    """
+    Simulate an audio callback loop and check that it allocates no sample buffers.
+
+    For every block size a processor is built and fed `blocks` blocks
+    through process(block, out) with preallocated input and output
+    buffers, like an audio driver would. tracemalloc checks two things:
+
+    * Snapshots taken before and after the loop must hold the same numpy
+      memory, so nothing accumulates with the number of blocks.
+    * The memory allocated temporarily within one block must not grow with
+      the block size. Some numpy calls (np.maximum.accumulate, ufuncs with
+      Python scalars) allocate a few hundred bytes of bookkeeping whatever
+      the array size, but a temporary array of samples grows with the block.
+
+    Raises an AssertionError if either fails. Returns {block_size: (peak
+    bytes allocated within a block, numpy bytes retained after the loop,
+    worst real-time factor)}.
+    """
+    numpy_memory = [tracemalloc.DomainFilter(True, np.lib.tracemalloc_domain)]
+    results = {}
+    for block_size in sorted(block_sizes):
+        processor = make_processor(sample_rate, block_size, channels)
+        inputs = list(np.random.default_rng(0).standard_normal((blocks, channels, block_size)) * 0.1)
+        out = np.empty((channels, block_size))
+        processor.process(inputs[0], out)
+        times = np.empty(blocks)
+        block_peak = 0
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot().filter_traces(numpy_memory)
+        for i, block in enumerate(inputs):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            processor.process(block, out)
+            times[i] = time.perf_counter() - start
+            block_peak = max(block_peak, tracemalloc.get_traced_memory()[1] - baseline)
+        after = tracemalloc.take_snapshot().filter_traces(numpy_memory)
+        tracemalloc.stop()
+        retained = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+
+        worst_realtime_factor = block_size / sample_rate / times.max()
+        results[block_size] = (block_peak, retained, worst_realtime_factor)
+        print(f"{block_size:5d} samples x {channels} ch: {block_peak:6d} bytes per block, {retained:6d} retained, "
+              f"median block {np.median(times) * 1e6:8.1f} us, worst {times.max() * 1e6:8.1f} us "
+              f"({worst_realtime_factor:.1f}x real time)")
+        if retained > 0:
+            raise AssertionError(f"process() kept {retained} bytes of numpy memory over {blocks} "
+                                 f"{block_size}-sample blocks")
+
+        # Less than one float32 sample more per extra sample in the block
+        smallest = min(results)
+        growth = block_peak - results[smallest][0]
+        if growth >= (block_size - smallest) * 4 and block_size > smallest:
+            raise AssertionError(f"process() allocates {block_peak} bytes per {block_size}-sample block, "
+                                 f"{growth} more than per {smallest}-sample block")
+    return results
+
+
+def check_spectrum_analyzer(sample_rate=44100, lengths=(*range(1, 40), 1024, 4097, 88200)):
+    """
+    Check that SpectrumAnalyzer handles the band layouts at the edges of the spectrum.
+
+    Very short signals put several bands on the last FFT bin, and an f_max
+    above the Nyquist frequency puts band edges past the end of the
+    spectrum. Every layout, statistic and length must give one finite level
+    per band frequency; otherwise an AssertionError is raised.
+    """
+    rng = np.random.default_rng(0)
+    layouts = (dict(bins_per_octave=3), dict(bins_per_octave=24), dict(bins_per_octave=3, f_max=30000),
+               dict(n_bins=50, f_max=100000))
+    for layout, statistic in itertools.product(layouts, ('sum', 'mean', 'max')):
+        analyzer = SpectrumAnalyzer(sample_rate, statistic=statistic, **layout)
+        for length in lengths:
+            freqs, levels = analyzer.analyze(rng.standard_normal((2, length)))
+            if levels.shape != (2, len(freqs)) or not np.all(np.isfinite(levels)):
+                raise AssertionError(f"SpectrumAnalyzer({layout}, statistic={statistic!r}) failed "
+                                     f"on {length} samples")
+    print(f"SpectrumAnalyzer: {len(layouts) * 3} layouts x {len(lengths)} lengths OK")
+
+
+def check_eq_fit(preset=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Simple_Audio_Equalizer',
+                                      'EQ_data.csv'), cases=6, tolerance_db=0.1):
+    """
+    Check that fit_eq_to_target() recovers targets the EQ can represent.
+
+    The targets are responses of the preset's bands (narrow bands up to Q 14
+    among them) with alternating and with random gains. Every fit must
+    match its target within tolerance_db; otherwise an AssertionError is
+    raised.
+    """
+    center_freqs, qs, _, sample_rate = load_eq_preset(preset)
+    freqs = np.geomspace(20, 20000, 1000)
+    rng = np.random.default_rng(0)
+    gain_sets = [np.array([6, -6, 3, -3, 9, -9, 4, -4, 2])] + [rng.uniform(-10, 10, len(center_freqs))
+                                                              for _ in range(cases - 1)]
+    for gains in gain_sets:
+        target = calculate_eq_response(freqs, center_freqs, gains, qs, sample_rate)
+        fitted = fit_eq_to_target(freqs, target, sample_rate, n_bands=len(center_freqs))
+        error = np.abs(calculate_eq_response(freqs, *fitted, sample_rate) - target).max()
+        if error > tolerance_db:
+            raise AssertionError(f"fit_eq_to_target() missed the preset with gains {np.round(gains, 2)} "
+                                 f"by {error:.2f} dB")
+    print(f"fit_eq_to_target: {len(gain_sets)} representable targets recovered within {tolerance_db} dB")
+
+
+def environment():
+    """Describe the machine and library versions the results were measured with."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'numpy': np.__version__,
+            'scipy': scipy.__version__, 'machine': platform.machine(), 'processor': platform.processor(),
+            'system': platform.platform(), 'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def save_results(results, json_path=None, csv_path=None):
+    """Write the results as JSON (with the environment) and/or CSV."""
+    if json_path:
+        with open(json_path, 'w') as file:
+            json.dump({'environment': environment(), 'results': results}, file, indent=1)
+    if csv_path:
+        with open(csv_path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+
+
+def compare_results(results, baseline_path, tolerance=0.1):
+    """
+    Compare results with a JSON file saved by an earlier run.
+
+    Prints the speed ratio of every case present in both runs and returns
+    the cases that got slower by more than tolerance.
+    """
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+
+    def key(result):
+        return result['kernel'], result['seconds'], result['channels'], result['bands'], result['dtype']
+
+    baseline_times = {key(result): result['best_time'] for result in baseline['results']}
+    regressions = []
+    for result in results:
+        if key(result) not in baseline_times:
+            continue
+        speed_up = baseline_times[key(result)] / result['best_time']
+        flag = ''
+        if speed_up < 1 - tolerance:
+            regressions.append(result)
+            flag = '  REGRESSION'
+        print(f"{' '.join(str(part) for part in key(result)):>60}: {speed_up:6.2f}x{flag}")
+    print(f"{len(regressions)} regressions against {baseline_path}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the EQ and compressor DSP kernels.")
+    parser.add_argument("--kernel", action="append", choices=list(KERNELS), help="Kernel to run (default: all)")
+    parser.add_argument("--seconds", type=float, nargs='+', default=DEFAULT_SECONDS, help="Signal lengths (s)")
+    parser.add_argument("--bands", type=int, nargs='+', default=DEFAULT_BANDS, help="EQ/crossover band counts")
+    parser.add_argument("--channels", type=int, nargs='+', default=DEFAULT_CHANNELS, help="Channel counts")
+    parser.add_argument("--dtype", nargs='+', default=DEFAULT_DTYPES, choices=('float64', 'float32'),
+                        help="Input sample types")
+    parser.add_argument("--sample-rate", type=int, default=48000, help="Sample rate (Hz)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum time spent timing each case (s)")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--csv", help="Write the results to this CSV file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--callback", action="store_true",
+                        help="Check the block processors for allocations in a simulated audio callback instead")
+    parser.add_argument("--check", action="store_true",
+                        help="Check the spectrum analyser on edge-case inputs and the EQ fit instead")
+    args = parser.parse_args()
+
+    if args.check:
+        check_spectrum_analyzer()
+        check_eq_fit()
+        raise SystemExit
+
+    if args.callback:
+        for name, make_processor in CALLBACK_PROCESSORS.items():
+            print(name)
+            check_callback_allocations(make_processor, channels=max(args.channels), sample_rate=args.sample_rate)
+        raise SystemExit
+
+    results = run_benchmarks(args.kernel, args.seconds, args.bands, args.channels, args.dtype,
+                             args.sample_rate, args.min_time)
+    save_results(results, args.json, args.csv)
+    if args.compare:
+        compare_results(results, args.compare)
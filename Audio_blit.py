@@ -0,0 +1,127 @@
+from matplotlib.transforms import Bbox
+
+
+class BlitManager:
+    """
+    Redraw only the artists of a figure that change.
+
+    The artists handed to add_artist() are marked animated, so full redraws
+    of the figure leave them out. After every full redraw (first show,
+    resize, zoom) the rest of the figure is cached as a background image.
+    update() then restores that image and draws just the animated artists on
+    top, which is far cheaper than redrawing every axis, grid, tick label and
+    widget. Given the artists that changed, update() only restores and
+    redraws the part of the figure they cover. Backends that cannot blit
+    fall back to draw_idle().
+    """
+
+    # Extra pixels around every artist for line widths and antialiasing
+    PADDING = 4
+
+    def __init__(self, canvas, artists=()):
+        self.canvas = canvas
+        self.artists = []
+        self._background = None
+        self._extents = {}
+        for artist in artists:
+            self.add_artist(artist)
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def add_artist(self, artist):
+        """Draw artist with the blitted updates instead of the background."""
+        artist.set_animated(True)
+        self.artists.append(artist)
+
+    def add_slider(self, slider):
+        """
+        Blit the moving parts of a Slider: its bar, handle and value text.
+
+        The slider stops redrawing the whole figure when its value changes,
+        so its on_changed callback must call update(). Returns the parts,
+        to be passed to update() when only this slider changed.
+        """
+        slider.drawon = False
+        parts = [slider.poly, slider._handle, slider.valtext]
+        for artist in parts:
+            self.add_artist(artist)
+        return parts
+
+    def _on_draw(self, event):
+        canvas = self.canvas
+        self._background = canvas.copy_from_bbox(canvas.figure.bbox) if canvas.supports_blit else None
+        self._draw_artists(self.artists)
+
+    def _extent(self, artist, renderer):
+        """Area an artist covers, limited to its clip box; None if it is clipped away."""
+        extent = artist.get_window_extent(renderer).padded(self.PADDING)
+        if artist.get_clip_on() and artist.get_clip_box() is not None:
+            extent = Bbox.intersection(extent, artist.get_clip_box().padded(self.PADDING))
+        return extent
+
+    def _draw_artists(self, artists):
+        figure = self.canvas.figure
+        renderer = self.canvas.get_renderer()
+        for artist in artists:
+            figure.draw_artist(artist)
+            self._extents[artist] = self._extent(artist, renderer)
+
+    def _region(self, changed):
+        """
+        Return the area to redraw for the changed artists and the animated
+        artists in it.
+
+        The area covers where the changed artists were and where they are
+        now. It grows until every animated artist overlapping it lies
+        inside it, so nothing is drawn twice over the same pixels.
+        """
+        renderer = self.canvas.get_renderer()
+        extents = [self._extent(artist, renderer) for artist in changed]
+        extents += [self._extents.get(artist) for artist in changed]
+        extents = [extent for extent in extents if extent is not None]
+        if not extents:
+            return None, []
+        region = Bbox.union(extents)
+        inside = set()
+        grown = True
+        while grown:
+            grown = False
+            for artist in self.artists:
+                extent = self._extents.get(artist)
+                if artist in inside or extent is None or not region.overlaps(extent):
+                    continue
+                inside.add(artist)
+                if not (region.contains(extent.x0, extent.y0) and region.contains(extent.x1, extent.y1)):
+                    region = Bbox.union([region, extent])
+                    grown = True
+        inside.update(changed)
+        return region, [artist for artist in self.artists if artist in inside]
+
+    def update(self, changed=None):
+        """
+        Show the current state of the animated artists.
+
+        With changed (a list of animated artists) only their part of the
+        figure is redrawn.
+        """
+        canvas = self.canvas
+        if self._background is None:
+            # No full draw yet, or no blitting support
+            canvas.draw_idle()
+            return
+        if changed is None:
+            canvas.restore_region(self._background)
+            self._draw_artists(self.artists)
+            canvas.blit(canvas.figure.bbox)
+        else:
+            region, artists = self._region(changed)
+            if region is not None:
+                region = Bbox.intersection(region, canvas.figure.bbox)
+            if region is None:
+                return
+            # restore_region() counts pixel rows from the top of the figure
+            height = int(canvas.figure.bbox.height)
+            x0, y0, x1, y1 = (int(v) for v in region.extents)
+            canvas.restore_region(self._background, bbox=(x0, height - y1 - 1, x1 + 1, height - y0), xy=(0, 0))
+            self._draw_artists(artists)
+            canvas.blit(region)
+        canvas.flush_events()
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+def sos_to_state_space(sos):
+    """
+    Return the (A, B, C, D) state-space matrices of a cascade of biquad sections.
+
+    Every section is in the transposed direct form II used by sosfilt(), so
+    the state vector is the concatenation of the sosfilt() zi of all
+    sections.
+    """
+    A, B, C, D = np.zeros((0, 0)), np.zeros(0), np.zeros(0), 1.0
+    for b0, b1, b2, a0, a1, a2 in np.asarray(sos, dtype=float) / np.asarray(sos, dtype=float)[:, 3:4]:
+        section_A = np.array([[-a1, 1.0], [-a2, 0.0]])
+        section_B = np.array([b1 - a1 * b0, b2 - a2 * b0])
+        section_C = np.array([1.0, 0.0])
+        n = len(B)
+        cascade_A = np.zeros((n + 2, n + 2))
+        cascade_A[:n, :n] = A
+        cascade_A[n:, :n] = np.outer(section_B, C)
+        cascade_A[n:, n:] = section_A
+        A = cascade_A
+        B = np.concatenate([B, section_B * D])
+        C = np.concatenate([b0 * C, section_C])
+        D = b0 * D
+    return A, B, C, D
+
+
+class BlockLinearFilter:
+    """
+    Filter fixed-size blocks through a biquad cascade without allocating memory.
+
+    For a block of N samples the output and the next filter state are a
+    linear function of the current state and the input, so the whole block
+    is computed with a single precomputed (state + N) x (N + state) matrix
+    product. All buffers are allocated up front for one block size and
+    channel count, and process() writes into a buffer supplied by the
+    caller, which makes it usable inside an audio callback. Blocks are
+    (channels x block_size) arrays; the cost per sample grows with the
+    block size, so this is meant for callback-sized blocks (up to about
+    1024 samples).
+    """
+
+    def __init__(self, sos, block_size, channels=1):
+        self.block_size = block_size
+        self.channels = channels
+        A, B, C, D = sos_to_state_space(sos)
+        self.A, self.B = A, B
+        n = len(B)
+
+        # powers[k] = A^k for k = 0 .. block_size
+        powers = np.empty((block_size + 1, n, n))
+        powers[0] = np.eye(n)
+        for k in range(block_size):
+            powers[k + 1] = powers[k] @ A
+        impulse_response = np.concatenate([[D], C @ powers[:-1] @ B])
+        lags = np.subtract.outer(np.arange(block_size), np.arange(block_size))
+
+        # [output, next state] = [state, input] @ transition
+        transition = np.zeros((n + block_size, block_size + n))
+        transition[:n, :block_size] = (C @ powers[:-1]).T
+        transition[n:, :block_size] = np.where(lags >= 0, impulse_response[np.maximum(lags, 0)], 0).T
+        transition[:n, block_size:] = powers[-1].T
+        transition[n:, block_size:] = powers[block_size - 1::-1] @ B
+        self.transition = transition
+
+        self.frame = np.zeros((channels, n + block_size))
+        self.result = np.zeros((channels, block_size + n))
+        self._state = self.frame[:, :n]
+        self._input = self.frame[:, n:]
+        self._output = self.result[:, :block_size]
+        self._next_state = self.result[:, block_size:]
+
+    def reset(self, initial_input=0.0):
+        """Set the state to the steady state of a constant input (silence by default)."""
+        n = len(self.B)
+        self._state[...] = np.linalg.solve(np.eye(n) - self.A, self.B) * initial_input if n else 0
+
+    def process(self, block, out):
+        """Filter one (channels x block_size) block into out (which may be block itself)."""
+        np.copyto(self._input, block)
+        np.dot(self.frame, self.transition, out=self.result)
+        np.copyto(self._state, self._next_state)
+        np.copyto(out, self._output)
+        return out
@@ -0,0 +1,93 @@
+import argparse
+
+from Audio_compressor_and_expander import DynamicsProcessor
+from Audio_equalizer import EQProcessor, FIREQProcessor, load_eq_preset
+from Specific_band_audio_compressor_and_expander import MultibandCompressor, StreamingBandProcessor
+from Audio_wav_io import process_wav
+
+
+def eq_processor(args):
+    center_freqs, qs, gains, _ = load_eq_preset(args.preset)
+    if args.linear_phase:
+        return lambda sample_rate: FIREQProcessor(sample_rate, center_freqs, gains, qs, num_taps=args.taps)
+    return lambda sample_rate: EQProcessor(sample_rate, center_freqs, gains, qs)
+
+
+def compress_processor(args):
+    return lambda sample_rate: DynamicsProcessor(
+        sample_rate, args.compressor_threshold, args.compressor_ratio, args.expander_threshold,
+        args.expander_ratio, attack_ms=args.attack_ms, release_ms=args.release_ms, detector=args.detector)
+
+
+def multiband_processor(args):
+    return lambda sample_rate: MultibandCompressor(
+        sample_rate, args.crossover, args.compressor_threshold, args.compressor_ratio, args.expander_threshold,
+        args.expander_ratio, attack_ms=args.attack_ms, release_ms=args.release_ms, detector=args.detector)
+
+
+def band_processor(args):
+    return lambda sample_rate: StreamingBandProcessor(
+        sample_rate, args.expander_threshold, args.compressor_threshold, args.compressor_ratio,
+        args.expander_ratio, (args.low, args.high), nperseg=args.nperseg)
+
+
+def add_file_arguments(parser):
+    parser.add_argument("input", help="Input WAV file")
+    parser.add_argument("output", help="Output WAV file")
+    parser.add_argument("--block-size", type=int, default=65536, help="Samples processed per block")
+
+
+def add_dynamics_arguments(parser, nargs=None):
+    """Add the threshold/ratio options; with nargs='+' they take one value per band."""
+    parser.add_argument("--compressor-threshold", type=float, nargs=nargs, default=-10, help="Compressor threshold (dB)")
+    parser.add_argument("--compressor-ratio", type=float, nargs=nargs, default=4, help="Compressor ratio")
+    parser.add_argument("--expander-threshold", type=float, nargs=nargs, default=-40, help="Expander threshold (dB)")
+    parser.add_argument("--expander-ratio", type=float, nargs=nargs, default=2, help="Expander ratio")
+
+
+def add_detector_arguments(parser):
+    parser.add_argument("--attack-ms", type=float, default=5.0, help="Detector attack time (ms)")
+    parser.add_argument("--release-ms", type=float, default=50.0, help="Detector release time (ms)")
+    parser.add_argument("--detector", choices=('peak', 'rms'), default='peak', help="Level detector")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Apply the EQ or a compressor/expander to a WAV file without any UI.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    eq = subparsers.add_parser("eq", help="Peaking EQ from a preset in the EQ_data.csv layout")
+    add_file_arguments(eq)
+    eq.add_argument("--preset", required=True, help="EQ preset file")
+    eq.add_argument("--linear-phase", action="store_true", help="Apply the EQ as one linear-phase FIR")
+    eq.add_argument("--taps", type=int,
+                    help="Length of the linear-phase FIR (default: long enough for the narrowest band)")
+    eq.set_defaults(make_processor=eq_processor)
+
+    compress = subparsers.add_parser("compress", help="Broadband compressor/expander")
+    add_file_arguments(compress)
+    add_dynamics_arguments(compress)
+    add_detector_arguments(compress)
+    compress.set_defaults(make_processor=compress_processor)
+
+    multiband = subparsers.add_parser("multiband", help="Linkwitz-Riley multiband compressor/expander")
+    add_file_arguments(multiband)
+    multiband.add_argument("--crossover", type=float, nargs='+', required=True, help="Crossover frequencies (Hz)")
+    add_dynamics_arguments(multiband, nargs='+')
+    add_detector_arguments(multiband)
+    multiband.set_defaults(make_processor=multiband_processor)
+
+    band = subparsers.add_parser("band", help="STFT compressor/expander on one frequency range")
+    add_file_arguments(band)
+    band.add_argument("--low", type=float, default=500, help="Lower edge of the frequency range (Hz)")
+    band.add_argument("--high", type=float, default=2000, help="Upper edge of the frequency range (Hz)")
+    band.add_argument("--nperseg", type=int, default=1024, help="STFT frame length")
+    add_dynamics_arguments(band)
+    band.set_defaults(make_processor=band_processor)
+
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    duration = process_wav(args.input, args.output, args.make_processor(args), args.block_size)
+    print(f"Processed {duration:.2f} s of audio into {args.output}")
@@ -1,6 +1,12 @@
+import threading
+from functools import lru_cache
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.widgets import Slider
+import scipy.signal
+
+from Audio_block_filter import BlockLinearFilter
+from Audio_profiler import profiler
+from Audio_result_cache import ResultCache
+from Audio_ui_worker import DebouncedWorker
 
 
 def compress_audio_sine_wave(
@@ -9,13 +15,22 @@ def compress_audio_sine_wave(
         expand_threshold_db, expand_ratio, amplitude):
     """
     Apply dynamic range compression and expansion to a generated sine wave.
+
+    frequency, amplitude and the threshold/ratio parameters can be scalars or
+    arrays (for example one value per channel). Array parameters broadcast
+    against each other and add leading axes to the result, so a
+    (channels x samples) pair of waves is generated in one call.
     """
     t = np.linspace(0, duration, int(sample_rate * duration), endpoint=False)
-    sine_wave = amplitude * np.sin(2 * np.pi * frequency * t)
+    sine_wave = np.asarray(amplitude)[..., None] * np.sin(2 * np.pi * np.asarray(frequency)[..., None] * t)
     # additional_sine = 0.2 * np.sin(2 * np.pi * 5000 * t)  # 1kHz sine wave
 
     # sine_wave = sine_wave + additional_sine
     
+    # Broadcast the (possibly per-channel) parameters over the time axis
+    sine_wave, compress_threshold_db, compress_ratio, expand_threshold_db, expand_ratio = np.broadcast_arrays(
+        sine_wave, *(np.asarray(p)[..., None] for p in (compress_threshold_db, compress_ratio,
+                                                        expand_threshold_db, expand_ratio)))
     compress_threshold_linear = 10 ** (compress_threshold_db / 20)
     expand_threshold_linear = 10 ** (expand_threshold_db / 20)
     
@@ -24,12 +39,12 @@ def compress_audio_sine_wave(
     
     # Compression (above compress threshold)
     compress_mask = amplitude_env > compress_threshold_linear
-    gain_reduction[compress_mask] = (compress_threshold_linear + (amplitude_env[compress_mask] - compress_threshold_linear) / compress_ratio) / amplitude_env[compress_mask]
+    gain_reduction[compress_mask] = (compress_threshold_linear[compress_mask] + (amplitude_env[compress_mask] - compress_threshold_linear[compress_mask]) / compress_ratio[compress_mask]) / amplitude_env[compress_mask]
     
     # Expansion (below expand threshold)
     expand_mask = amplitude_env < expand_threshold_linear
     # Calculate expansion gain reduction
-    gain_reduction[expand_mask] = (amplitude_env[expand_mask] / expand_threshold_linear) ** (expand_ratio - 1)
+    gain_reduction[expand_mask] = (amplitude_env[expand_mask] / expand_threshold_linear[expand_mask]) ** (expand_ratio[expand_mask] - 1)
     #gain_reduction[expand_mask] = expand_threshold_linear - (expand_threshold_linear - amplitude_env[expand_mask]) * expand_ratio
 
     
@@ -37,7 +52,13 @@ def compress_audio_sine_wave(
     return sine_wave, processed_audio
 
 
+cached_compress_audio_sine_wave = ResultCache(compress_audio_sine_wave)
+
+
 def create_combined_interactive_plot():
+    import matplotlib.pyplot as plt
+    from matplotlib.widgets import Slider
+
     # Initial parameters
     frequency = 440
     duration = 0.01
@@ -176,21 +197,297 @@ def apply_expander_compressor(input_db, compressor_threshold_db, compressor_rati
     - Expand signals below the expander threshold using the expander ratio.
     - Compress signals above the compressor threshold using the compressor ratio.
     - Leave signals between the thresholds unchanged.
-    """
-    output_db = np.copy(input_db)
 
+    The thresholds and ratios may be arrays that broadcast against input_db,
+    for example one value per channel.
+    """
     # Apply expansion for signals below the expander threshold
-    mask_expansion = input_db < expander_threshold_db
-    output_db[mask_expansion] = expander_threshold_db - (expander_threshold_db - input_db[mask_expansion]) * expander_ratio
+    output_db = np.where(input_db < expander_threshold_db,
+                         expander_threshold_db - (expander_threshold_db - input_db) * expander_ratio,
+                         input_db)
 
     # Apply compression for signals above the compressor threshold
-    mask_compression = input_db > compressor_threshold_db
-    output_db[mask_compression] = compressor_threshold_db + (input_db[mask_compression] - compressor_threshold_db) / compressor_ratio
+    output_db = np.where(input_db > compressor_threshold_db,
+                         compressor_threshold_db + (input_db - compressor_threshold_db) / compressor_ratio,
+                         output_db)
 
     # Signals between the two thresholds remain unchanged
     return output_db
 
+class GainCurve:
+    """
+    Combined expander/compressor transfer function tabulated on a fine dB grid.
+
+    The curve of apply_expander_compressor() and the matching linear gain
+    are computed once for a set of parameters and then applied to any number
+    of levels by linear interpolation. Output levels outside the grid are
+    extrapolated along the first or last segment, which is exact because the
+    curve is linear there; gains outside the grid are held at the edge value.
+
+    The tables are read-only and every thread gets its own working
+    buffers, reused between its calls, so one instance can be shared by
+    several threads (as the ones from get_gain_curve() are).
+    """
+
+    def __init__(self, compressor_threshold_db, compressor_ratio, expander_threshold_db, expander_ratio,
+                 min_db=-200.0, max_db=60.0, step_db=0.01):
+        # Keep both knees inside the grid
+        self.min_db = min(min_db, expander_threshold_db - 1, compressor_threshold_db - 1)
+        max_db = max(max_db, compressor_threshold_db + 1, expander_threshold_db + 1)
+        self.step_db = step_db
+        self._inverse_step = 1 / step_db
+        self._grid_offset = self.min_db / step_db
+        grid = self.min_db + step_db * np.arange(int(np.ceil((max_db - self.min_db) / step_db)) + 1)
+        self.table = apply_expander_compressor(grid, compressor_threshold_db, compressor_ratio,
+                                               expander_threshold_db, expander_ratio)
+        self.slope = np.diff(self.table)
+        self.gain_table = 10 ** ((self.table - grid) / 20)
+        self.gain_slope = np.diff(self.gain_table)
+        # float32 copies, so float32 levels are interpolated without casting to float64
+        self._tables = {np.dtype(np.float64): (self.table, self.slope, self.gain_table, self.gain_slope)}
+        self._tables[np.dtype(np.float32)] = tuple(table.astype(np.float32)
+                                                   for table in self._tables[np.dtype(np.float64)])
+        for tables in self._tables.values():
+            for table in tables:
+                table.setflags(write=False)
+        self._local = threading.local()
+
+    def _scratch(self, shape, dtype):
+        """Working buffers of the calling thread for one input shape and dtype, reused between calls."""
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None or buffers[0].shape != shape or buffers[0].dtype != dtype:
+            buffers = self._local.buffers = (np.empty(shape, dtype), np.empty(shape, dtype),
+                                             np.empty(shape, dtype=np.intp))
+        return buffers
+
+    def _interpolate(self, use_gain, input_db, out, extrapolate, scratch):
+        # float32 levels are processed in float32, anything else in float64
+        input_db = np.asarray(input_db)
+        if input_db.dtype != np.float32:
+            input_db = input_db.astype(float, copy=False)
+        if out is None:
+            out = np.empty(input_db.shape, input_db.dtype)
+        tables = self._tables[input_db.dtype]
+        table, slope = tables[2:] if use_gain else tables[:2]
+        position, fraction, index = scratch or self._scratch(input_db.shape, input_db.dtype)
+
+        # Fractional grid position, integer segment index and offset in the segment.
+        # Plain ufuncs and ndarray.take() keep this free of temporary arrays.
+        np.multiply(input_db, self._inverse_step, out=position)
+        np.subtract(position, self._grid_offset, out=position)
+        if not extrapolate:
+            np.maximum(position, 0, out=position)
+            np.minimum(position, len(slope), out=position)
+        np.maximum(position, 0, out=fraction)
+        np.minimum(fraction, len(slope) - 1, out=fraction)
+        np.floor(fraction, out=fraction)
+        index[...] = fraction
+        np.subtract(position, fraction, out=fraction)
+
+        slope.take(index, out=position, mode='clip')
+        np.multiply(position, fraction, out=position)
+        table.take(index, out=out, mode='clip')
+        np.add(out, position, out=out)
+        return out
+
+    def __call__(self, input_db, out=None, scratch=None):
+        """
+        Return the output levels (dB) for input_db.
+
+        With out given (which may be input_db itself) the result is written
+        there and no new arrays are allocated. scratch can supply the
+        (position, fraction, index) working buffers, shaped like input_db
+        with index of dtype intp, instead of the calling thread's own.
+        """
+        return self._interpolate(False, input_db, out, True, scratch)
+
+    def gain(self, input_db, out=None, scratch=None):
+        """Return the linear gain to apply at the levels input_db, optionally into out (see __call__)."""
+        return self._interpolate(True, input_db, out, False, scratch)
+
+@lru_cache(maxsize=32)
+def get_gain_curve(compressor_threshold_db, compressor_ratio, expander_threshold_db, expander_ratio):
+    """
+    Return the GainCurve for a parameter set, tabulating it only on first use.
+
+    The same instance is returned to every caller, in any thread.
+    """
+    return GainCurve(compressor_threshold_db, compressor_ratio, expander_threshold_db, expander_ratio)
+
+class DynamicsProcessor:
+    """
+    Compressor/expander for arbitrary audio, driven by an envelope follower.
+
+    The detector follows the peak (|x|) or the power (x^2, for RMS detection)
+    of the input. Rising levels are tracked with the attack time constant and
+    falling levels decay with the release time constant. The detected level
+    goes through the same threshold/ratio transfer function as
+    apply_expander_compressor() and the resulting gain is applied to the
+    input.
+
+    Blocks are mono or (channels x samples) arrays; the detector state of
+    every channel is carried from one call of process() to the next.
+    """
+
+    # Detector floor, keeps log() finite on digital silence
+    LEVEL_FLOOR = 1e-10
+
+    def __init__(self, sample_rate, compressor_threshold_db, compressor_ratio,
+                 expander_threshold_db, expander_ratio,
+                 attack_ms=5.0, release_ms=50.0, detector='peak'):
+        if detector not in ('peak', 'rms'):
+            raise ValueError(f"Unknown detector: {detector}")
+        self.sample_rate = sample_rate
+        self.compressor_threshold_db = compressor_threshold_db
+        self.compressor_ratio = compressor_ratio
+        self.expander_threshold_db = expander_threshold_db
+        self.expander_ratio = expander_ratio
+        self.detector = detector
+        self.gain_curve = GainCurve(compressor_threshold_db, compressor_ratio,
+                                    expander_threshold_db, expander_ratio)
+        self.attack_coefficient = self._smoothing_coefficient(attack_ms)
+        self.release_coefficient = self._smoothing_coefficient(release_ms)
+        self.reset()
+
+    def _smoothing_coefficient(self, time_ms):
+        """One-pole coefficient reaching 1 - 1/e of a step after time_ms."""
+        if time_ms <= 0:
+            return 0.0
+        return np.exp(-1000 / (time_ms * self.sample_rate))
+
+    def reset(self):
+        """Clear the detector state."""
+        self.held_log_level = None
+        self.attack_zi = None
+
+    def detect(self, block):
+        """Return the detected level envelope (linear amplitude) of a block."""
+        block = np.asarray(block, dtype=float)
+        level = np.abs(block) if self.detector == 'peak' else block ** 2
+        floor = self.LEVEL_FLOOR if self.detector == 'peak' else self.LEVEL_FLOOR ** 2
+        if self.held_log_level is None:
+            self.held_log_level = np.full(block.shape[:-1], np.log(floor))
+            self.attack_zi = np.full(block.shape[:-1] + (1,), self.attack_coefficient * floor)
+
+        # Release stage: held[n] = max(level[n], release * held[n-1]). In the
+        # log domain this is a running maximum of log(level[k]) - k*log(release)
+        # shifted back by n*log(release), which numpy evaluates in one pass.
+        log_release = np.log(self.release_coefficient) if self.release_coefficient > 0 else -np.inf
+        if np.isfinite(log_release):
+            ramp = np.arange(1, block.shape[-1] + 1) * log_release
+            held = np.log(np.maximum(level, floor)) - ramp
+            held = np.maximum.accumulate(held, axis=-1)
+            held = np.exp(np.maximum(held, self.held_log_level[..., None]) + ramp)
+        else:
+            held = np.maximum(level, floor)
+        self.held_log_level = np.log(held[..., -1])
+
+        # Attack stage: one-pole smoothing of the held level
+        a = self.attack_coefficient
+        envelope, self.attack_zi = scipy.signal.lfilter([1 - a], [1, -a], held, zi=self.attack_zi)
+
+        return envelope if self.detector == 'peak' else np.sqrt(envelope)
+
+    def process(self, block):
+        """Compress/expand the next block and return the processed block."""
+        block = np.asarray(block, dtype=float)
+        with profiler.stage('DynamicsProcessor.process', block.shape[-1], self.sample_rate):
+            with profiler.stage('DynamicsProcessor.detector'):
+                level_db = 20 * np.log10(np.maximum(self.detect(block), self.LEVEL_FLOOR))
+            with profiler.stage('DynamicsProcessor.gain'):
+                return block * self.gain_curve.gain(level_db, out=level_db)
+
+class BlockDynamicsProcessor(DynamicsProcessor):
+    """
+    DynamicsProcessor for a fixed block size and channel count that allocates no sample buffers.
+
+    The detector, the gain computer and the gain stage work in buffers
+    allocated up front, and process() writes the result into a buffer
+    supplied by the caller, for use inside audio callbacks. The only
+    allocation per block is a fixed few hundred bytes of numpy bookkeeping,
+    mostly in np.maximum.accumulate(), whatever the block size. Blocks are
+    (channels x block_size) arrays. The output matches DynamicsProcessor to
+    rounding error.
+    """
+
+    def __init__(self, sample_rate, compressor_threshold_db, compressor_ratio,
+                 expander_threshold_db, expander_ratio, block_size, channels=1,
+                 attack_ms=5.0, release_ms=50.0, detector='peak'):
+        self.block_size = block_size
+        self.channels = channels
+        self.attack_filter = None
+        self.level = np.empty((channels, block_size))
+        self.held_log_level = np.empty(channels)
+        # Working buffers of the gain curve, so that the callback thread does not allocate its own
+        self.gain_scratch = (np.empty((channels, block_size)), np.empty((channels, block_size)),
+                             np.empty((channels, block_size), dtype=np.intp))
+        self._first_log_level = self.level[:, 0]
+        self._last_log_level = self.level[:, -1]
+        super().__init__(sample_rate, compressor_threshold_db, compressor_ratio, expander_threshold_db,
+                         expander_ratio, attack_ms=attack_ms, release_ms=release_ms, detector=detector)
+
+        self.floor = self.LEVEL_FLOOR if detector == 'peak' else self.LEVEL_FLOOR ** 2
+        self.release_ramp = None
+        if self.release_coefficient > 0:
+            # Full (channels x block_size) so that no ufunc below has to broadcast
+            ramp = np.arange(1, block_size + 1) * np.log(self.release_coefficient)
+            self.release_ramp = np.tile(ramp, (channels, 1))
+        a = self.attack_coefficient
+        self.attack_filter = BlockLinearFilter(np.array([[1 - a, 0, 0, 1, -a, 0]]), block_size, channels)
+        self.reset()
+
+        # Run one block so that numpy fills its process-wide ufunc caches now
+        # rather than in the first callback
+        self.process(np.zeros((channels, block_size)), np.empty((channels, block_size)))
+        self.reset()
+
+    def reset(self):
+        """Clear the detector state."""
+        if self.attack_filter is None:
+            return
+        self.held_log_level[...] = np.log(self.floor)
+        self.attack_filter.reset(self.floor)
+
+    def process(self, block, out=None):
+        """Compress/expand the next block into out (a new array if out is None)."""
+        if out is None:
+            out = np.empty(np.shape(block))
+        level = self.level
+        if self.detector == 'peak':
+            np.abs(block, out=level)
+        else:
+            np.multiply(block, block, out=level)
+        np.maximum(level, self.floor, out=level)
+
+        # Release stage, see DynamicsProcessor.detect()
+        if self.release_ramp is not None:
+            # The held level of the previous block enters through the first
+            # sample and is carried forward by the running maximum
+            np.log(level, out=level)
+            np.subtract(level, self.release_ramp, out=level)
+            np.maximum(self._first_log_level, self.held_log_level, out=self._first_log_level)
+            np.maximum.accumulate(level, axis=-1, out=level)
+            np.add(level, self.release_ramp, out=level)
+            np.copyto(self.held_log_level, self._last_log_level)
+            np.exp(level, out=level)
+
+        # Attack stage
+        self.attack_filter.process(level, level)
+        if self.detector == 'rms':
+            np.sqrt(level, out=level)
+
+        # Gain computer and gain stage
+        np.maximum(level, self.LEVEL_FLOOR, out=level)
+        np.log10(level, out=level)
+        np.multiply(level, 20, out=level)
+        self.gain_curve.gain(level, out=level, scratch=self.gain_scratch)
+        return np.multiply(block, level, out=out)
+
 def plot_expander_compressor_separate_thresholds():
+    import matplotlib.pyplot as plt
+    from matplotlib.widgets import Slider
+    from Audio_blit import BlitManager
+
     # Initial parameters
     frequency = 440
     duration = 0.01
@@ -218,11 +515,11 @@ def plot_expander_compressor_separate_thresholds():
     wave_original, = ax1.plot(t * 1000, original_wave, label="Original", alpha=0.7)
     wave_compressed_expanded, = ax1.plot(t * 1000, compressed_expanded_wave, label="Compressed", alpha=0.7)
     wave_compress_threshold = ax1.axhline(y=10 ** (initial_compressor_threshold / 20), color='r', 
-                                linestyle='--', label=f'Compressor Threshold ({initial_compressor_threshold}dB)')
+                                linestyle='--', label=f'Compressor Threshold ({initial_compressor_threshold:.1f}dB)')
     wave_compress_neg_threshold = ax1.axhline(y=-10 ** (initial_compressor_threshold / 20), color='r', 
                                     linestyle='--')
     wave_expand_threshold = ax1.axhline(y=10 ** (initial_expander_threshold / 20), color='g', 
-                                linestyle='--', label=f'Expander Threshold ({initial_expander_threshold}dB)')
+                                linestyle='--', label=f'Expander Threshold ({initial_expander_threshold:.1f}dB)')
     wave_expand_neg_threshold = ax1.axhline(y=-10 ** (initial_expander_threshold / 20), color='g', 
                                     linestyle='--')
 
@@ -231,7 +528,8 @@ def plot_expander_compressor_separate_thresholds():
     ax1.set_ylabel("Amplitude")
     ax1.set_title("Waveform Comparison")
     ax1.grid(True, alpha=0.3)
-    ax1.legend()
+    wave_legend = ax1.legend(loc='lower right')
+    compressor_legend_text, expander_legend_text = wave_legend.get_texts()[2:4]
     ax1.set_ylim(-1.5, 1.5)
 
     # Right subplot - Transfer Function
@@ -265,7 +563,7 @@ def plot_expander_compressor_separate_thresholds():
     ax2.set_title('Expander and Compressor with Separate Thresholds (Interactive)', pad=20)
     ax2.set_xlabel('Input Level (dB)')
     ax2.set_ylabel('Output Level (dB)')
-    ax2.legend()
+    ax2.legend(loc='lower right')
     ax2.set_xlim(-60, 0)
     ax2.set_ylim(-60, 0)
     ax2.axis('square')
@@ -283,70 +581,88 @@ def plot_expander_compressor_separate_thresholds():
     expander_ratio_slider = Slider(ax_expander_ratio, 'Expander Ratio', 1, 10, valinit=initial_expander_ratio)
     amplitude_slider = Slider(ax=ax_amplitude, label='Input Amplitude', valmin=0.01, valmax=1.0, valinit=initial_amplitude)
     
-    # Update function for sliders
-    def update(val):
-        # Get current slider values
-        compressor_threshold = compressor_threshold_slider.val
-        compressor_ratio = compressor_ratio_slider.val
-        expander_threshold = expander_threshold_slider.val
-        expander_ratio = expander_ratio_slider.val
-        amplitude = amplitude_slider.val
-
-        
-        # Update waveform plot
-        new_original, new_compressed_expanded = compress_audio_sine_wave(
-            frequency, duration, sample_rate,
-            compressor_threshold, compressor_ratio,
-            expander_threshold, expander_ratio,
-            amplitude
-        )
-
-        wave_original.set_ydata(new_original)
-        wave_compressed_expanded.set_ydata(new_compressed_expanded)
+    def compute(params):
+        compressor_threshold, compressor_ratio, expander_threshold, expander_ratio, amplitude = params
+        with profiler.stage('compressor_ui.dsp'):
+            new_original, new_compressed_expanded = cached_compress_audio_sine_wave(
+                frequency, duration, sample_rate,
+                compressor_threshold, compressor_ratio,
+                expander_threshold, expander_ratio,
+                amplitude
+            )
+
+            # Update the combined curve
+            output_db = apply_expander_compressor(
+                input_db,
+                compressor_threshold,
+                compressor_ratio,
+                expander_threshold,
+                expander_ratio
+            )
+        return new_original, new_compressed_expanded, output_db
+
+    def show(params, result):
+        compressor_threshold, _, expander_threshold, _, _ = params
+        new_original, new_compressed_expanded, output_db = result
+
+        with profiler.stage('compressor_ui.set_ydata'):
+            # Update waveform plot
+            wave_original.set_ydata(new_original)
+            wave_compressed_expanded.set_ydata(new_compressed_expanded)
+
+            compress_threshold_linear = 10 ** (compressor_threshold / 20)
+            wave_compress_threshold.set_ydata([compress_threshold_linear, compress_threshold_linear])
+            expand_threshold_linear = 10 ** (expander_threshold / 20)
+            wave_expand_threshold.set_ydata([expand_threshold_linear, expand_threshold_linear])
+            wave_compress_neg_threshold.set_ydata([-compress_threshold_linear, -compress_threshold_linear])
+            wave_expand_neg_threshold.set_ydata([-expand_threshold_linear, -expand_threshold_linear])
+
+            combined_line.set_ydata(output_db)
+
+            # Update threshold lines
+            expander_threshold_line_x.set_xdata([expander_threshold, expander_threshold])
+            expander_threshold_line_y.set_ydata([expander_threshold, expander_threshold])
+
+            compressor_threshold_line_x.set_xdata([compressor_threshold, compressor_threshold])
+            compressor_threshold_line_y.set_ydata([compressor_threshold, compressor_threshold])
+
+        with profiler.stage('compressor_ui.legend'):
+            # Update the threshold labels in place instead of rebuilding the legend
+            compressor_legend_text.set_text(f'Compressor Threshold ({compressor_threshold:.1f}dB)')
+            expander_legend_text.set_text(f'Expander Threshold ({expander_threshold:.1f}dB)')
+
+    # Only the curves, threshold lines, legends and slider parts change;
+    # everything else is drawn once and blitted from a cached background.
+    # The legends have fixed locations: loc='best' would search all line
+    # data on every blit.
+    plot_artists = [wave_original, wave_compressed_expanded, wave_compress_threshold, wave_compress_neg_threshold,
+                    wave_expand_threshold, wave_expand_neg_threshold, wave_legend, combined_line,
+                    expander_threshold_line_x, expander_threshold_line_y,
+                    compressor_threshold_line_x, compressor_threshold_line_y, ax2.get_legend()]
+    blit = BlitManager(fig.canvas, plot_artists)
+    sliders = [compressor_threshold_slider, compressor_ratio_slider, expander_threshold_slider,
+               expander_ratio_slider, amplitude_slider]
+    slider_artists = {slider: blit.add_slider(slider) for slider in sliders}
+
+    # Slider events only record the newest values; the DSP runs in the background
+    worker = DebouncedWorker(fig.canvas, compute, show, redraw=lambda: blit.update(plot_artists))
 
-        compress_threshold_linear = 10 ** (compressor_threshold / 20)
-        wave_compress_threshold.set_ydata([compress_threshold_linear, compress_threshold_linear])
-        expand_threshold_linear = 10 ** (expander_threshold / 20)
-        wave_expand_threshold.set_ydata([expand_threshold_linear, expand_threshold_linear])
-        wave_compress_neg_threshold.set_ydata([-compress_threshold_linear, -compress_threshold_linear])
-        wave_expand_neg_threshold.set_ydata([-expand_threshold_linear, -expand_threshold_linear])
-
-        
-
-        # Update the combined curve
-        output_db = apply_expander_compressor(
-            input_db,
-            compressor_threshold,
-            compressor_ratio,
-            expander_threshold,
-            expander_ratio
-        )
-        combined_line.set_ydata(output_db)
-
-        # Update threshold lines
-        expander_threshold_line_x.set_xdata([expander_threshold, expander_threshold])
-        expander_threshold_line_y.set_ydata([expander_threshold, expander_threshold])
-
-        compressor_threshold_line_x.set_xdata([compressor_threshold, compressor_threshold])
-        compressor_threshold_line_y.set_ydata([compressor_threshold, compressor_threshold])
-
-
-        # # Update threshold line labels
-        wave_compress_threshold.set_label(f'Compressor Threshold ({compressor_threshold:.1f}dB)')
-        wave_expand_threshold.set_label(f'Expander Threshold ({expander_threshold:.1f}dB)')
-        ax1.legend()
-        
-        # Redraw the figure
-        fig.canvas.draw_idle()
+    # Update function for sliders
+    @profiler.timed('compressor_ui.update')
+    def update(slider):
+        worker.submit((compressor_threshold_slider.val, compressor_ratio_slider.val,
+                       expander_threshold_slider.val, expander_ratio_slider.val,
+                       amplitude_slider.val))
+        # Move the slider itself right away
+        blit.update(slider_artists[slider])
 
     # Connect sliders to the update function
-    expander_threshold_slider.on_changed(update)
-    compressor_threshold_slider.on_changed(update)
-    compressor_ratio_slider.on_changed(update)
-    expander_ratio_slider.on_changed(update)
-    amplitude_slider.on_changed(update)
+    for slider in sliders:
+        slider.on_changed(lambda _, slider=slider: update(slider))
 
+    profiler.instrument_canvas(fig.canvas, 'compressor_ui.draw')
     plt.show()
 
 # Run the interactive plot
-plot_expander_compressor_separate_thresholds()
+if __name__ == "__main__":
+    plot_expander_compressor_separate_thresholds()
@@ -1,41 +1,579 @@
+import time
+from functools import lru_cache
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.widgets import Slider, TextBox
+import scipy.fft
 import scipy.signal
-from matplotlib.gridspec import GridSpec
+import scipy.optimize
+
+from Audio_block_filter import BlockLinearFilter
+from Audio_profiler import profiler
+from Audio_result_cache import ResultCache
+from Audio_ui_worker import DebouncedWorker
 
 def generate_sine_wave(frequency, duration, sample_rate=44100):
     """Generate a sine wave at specified frequency."""
     t = np.linspace(0, duration, int(sample_rate * duration))
     return np.sin(2 * np.pi * frequency * t), t
 
+@profiler.timed('calculate_spectrum')
 def calculate_spectrum(signal, sample_rate):
-    """Calculate the frequency spectrum of a signal."""
-    n = len(signal)
+    """Calculate the frequency spectrum of a signal (along its last axis)."""
+    n = np.shape(signal)[-1]
     freqs = np.fft.rfftfreq(n, 1/sample_rate)
     spectrum = np.abs(np.fft.rfft(signal))
     return freqs, 20 * np.log10(spectrum + 1e-10)
 
-def apply_eq_filters(signal, sample_rate, center_freqs, gains, qs):
-    """Apply EQ filters to the input signal."""
+class SpectrumAnalyzer:
+    """
+    Reusable spectrum analyser with optional log-spaced bins and Welch averaging.
+
+    The FFT size is rounded up to a fast length with scipy.fft.next_fast_len,
+    and the window and the bin layout are computed once per input length and
+    reused by later calls of the same length (scipy.fft caches its plans per
+    size as well). workers is passed to scipy.fft to run multi-dimensional
+    inputs on several threads.
+
+    Without bins_per_octave or n_bins every FFT bin is returned, like
+    calculate_spectrum(). bins_per_octave=3 gives third-octave bands
+    centred on 1 kHz, n_bins=N gives N log-spaced bands between f_min and
+    f_max. statistic combines the FFT bins of a band: 'sum' (band power,
+    the usual choice for fractional-octave analysis), 'mean' or 'max'. Bands
+    narrower than one FFT bin take the nearest bin.
+
+    With segment_size the signal is split into overlapping windowed
+    segments whose power spectra are averaged (Welch's method). Levels are
+    in dB, scaled so that a sine has the same peak level with any window
+    and matching calculate_spectrum() for a rectangular window.
+    """
+
+    def __init__(self, sample_rate, bins_per_octave=None, n_bins=None, f_min=20.0, f_max=None,
+                 segment_size=None, overlap=0.5, window=None, statistic='sum', workers=None):
+        if bins_per_octave and n_bins:
+            raise ValueError("Give either bins_per_octave or n_bins, not both")
+        if statistic not in ('sum', 'mean', 'max'):
+            raise ValueError(f"Unknown statistic: {statistic}")
+        self.sample_rate = sample_rate
+        self.bins_per_octave = bins_per_octave
+        self.n_bins = n_bins
+        self.f_min = f_min
+        self.f_max = min(f_max or sample_rate / 2, sample_rate / 2)
+        self.segment_size = segment_size
+        self.overlap = overlap
+        self.window = window or ('hann' if segment_size else 'boxcar')
+        self.statistic = statistic
+        self.workers = workers
+        self._length = None
+
+    def band_edges(self):
+        """Return (lower edges, centres, upper edges) of the bands in Hz."""
+        if self.bins_per_octave:
+            first = np.ceil(self.bins_per_octave * np.log2(self.f_min / 1000))
+            last = np.floor(self.bins_per_octave * np.log2(self.f_max / 1000))
+            centres = 1000 * 2 ** (np.arange(first, last + 1) / self.bins_per_octave)
+            half_width = 2 ** (1 / (2 * self.bins_per_octave))
+            return centres / half_width, centres, centres * half_width
+        edges = np.geomspace(self.f_min, self.f_max, self.n_bins + 1)
+        return edges[:-1], np.sqrt(edges[:-1] * edges[1:]), edges[1:]
+
+    def _setup(self, length):
+        """Compute the FFT size, window and bin layout for one input length."""
+        if length == self._length:
+            return
+        self._length = length
+        self.frame_size = min(self.segment_size or length, length)
+        self.hop = max(1, int(round(self.frame_size * (1 - self.overlap))))
+        self.n_fft = scipy.fft.next_fast_len(self.frame_size, real=True)
+
+        if self.window == 'boxcar':
+            self._window = None
+        else:
+            window = scipy.signal.get_window(self.window, self.frame_size)
+            # Coherent gain of 1, like a rectangular window
+            self._window = window * (self.frame_size / window.sum())
+
+        fft_freqs = scipy.fft.rfftfreq(self.n_fft, 1 / self.sample_rate)
+        if not (self.bins_per_octave or self.n_bins):
+            self.freqs = fft_freqs
+            self._indices = None
+            return
+        lower, centres, upper = self.band_edges()
+        n_freqs = len(fft_freqs)
+        starts = np.searchsorted(fft_freqs, lower)
+        stops = np.searchsorted(fft_freqs, upper)
+        narrow = stops <= starts
+        starts[narrow] = np.round(centres[narrow] * self.n_fft / self.sample_rate)
+        starts = np.clip(starts, 0, n_freqs - 1)
+        stops = np.clip(np.maximum(stops, starts + 1), 0, n_freqs)
+        # Bands that still hold no FFT bin are left out
+        keep = starts < stops
+        starts, stops = starts[keep], stops[keep]
+        self.freqs = centres[keep]
+        self._counts = stops - starts
+        # reduceat() over interleaved starts and stops reduces [start, stop) at
+        # the even positions. Stops may be the end of the spectrum, so the
+        # power gets one zero bin past the end for them to point at.
+        self._indices = np.column_stack([starts, stops]).ravel()
+
+    def analyze(self, signal):
+        """Return (frequencies, levels in dB) of signal along its last axis."""
+        signal = np.asarray(signal)
+        with profiler.stage('SpectrumAnalyzer.analyze', signal.shape[-1], self.sample_rate):
+            return self._analyze(signal)
+
+    def _analyze(self, signal):
+        self._setup(signal.shape[-1])
+        if self.frame_size < signal.shape[-1]:
+            frames = np.lib.stride_tricks.sliding_window_view(signal, self.frame_size, axis=-1)[..., ::self.hop, :]
+        else:
+            frames = signal[..., None, :]
+        if self._window is not None:
+            frames = frames * self._window
+
+        spectrum = scipy.fft.rfft(frames, n=self.n_fft, axis=-1, workers=self.workers)
+        power = spectrum.real ** 2
+        power += spectrum.imag ** 2
+        if self._indices is None:
+            return self.freqs, 10 * np.log10(power.mean(axis=-2) + 1e-20)
+
+        averaged = np.zeros(power.shape[:-2] + (power.shape[-1] + 1,))
+        np.mean(power, axis=-2, out=averaged[..., :-1])
+        if self.statistic == 'max':
+            power = np.maximum.reduceat(averaged, self._indices, axis=-1)[..., ::2]
+        else:
+            power = np.add.reduceat(averaged, self._indices, axis=-1)[..., ::2]
+            if self.statistic == 'mean':
+                power /= self._counts
+        return self.freqs, 10 * np.log10(power + 1e-20)
+
+# Number of (frequency, gain, Q, sample rate) entries kept by the coefficient cache
+COEFFICIENT_CACHE_SIZE = 512
+
+@lru_cache(maxsize=COEFFICIENT_CACHE_SIZE)
+def calculate_peaking_coefficients(f, g, q, sample_rate):
+    """
+    Calculate the biquad coefficients of a single peaking EQ band.
+
+    Results are memoised with LRU eviction. Only the signal path uses them
+    (calculate_eq_sos() and apply_eq_filters()), so filtering again after
+    one slider moved only recomputes the band that changed; the response
+    curve comes from the closed form of calculate_eq_response(). Use
+    calculate_peaking_coefficients.cache_info() to read the hit/miss counters.
+    """
+    w0 = 2 * np.pi * f / sample_rate
+    alpha = np.sin(w0) / (2 * q)
+    A = 10 ** (g / 40)
+
+    b0 = 1 + alpha * A
+    b1 = -2 * np.cos(w0)
+    b2 = 1 - alpha * A
+    a0 = 1 + alpha / A
+    a1 = -2 * np.cos(w0)
+    a2 = 1 - alpha / A
+
+    return (b0, b1, b2), (a0, a1, a2)
+
+def calculate_eq_sos(sample_rate, center_freqs, gains, qs):
+    """Stack all EQ bands into one normalised second-order-sections matrix."""
+    sos = np.empty((len(center_freqs), 6))
+    for i, (f, g, q) in enumerate(zip(center_freqs, gains, qs)):
+        b, a = calculate_peaking_coefficients(f, g, q, sample_rate)
+        sos[i, :3] = np.divide(b, a[0])
+        sos[i, 3:] = np.divide(a, a[0])
+    return sos
+
+@profiler.timed('calculate_eq_response')
+def calculate_eq_response(freqs, center_freqs, gains, qs, sample_rate):
+    """
+    Calculate the magnitude response (dB) of a peaking EQ at the given frequencies.
+
+    The squared magnitude of every biquad is evaluated in closed form in a
+    single (bands x frequencies) array operation. center_freqs, gains and qs
+    broadcast against each other along the last (band) axis, so passing
+    (presets x bands) parameter arrays returns a (presets x frequencies)
+    response matrix.
+    """
+    freqs = np.asarray(freqs, dtype=float)
+    w0 = 2 * np.pi * np.asarray(center_freqs, dtype=float)[..., None] / sample_rate
+    alpha = np.sin(w0) / (2 * np.asarray(qs, dtype=float)[..., None])
+    A = 10 ** (np.asarray(gains, dtype=float)[..., None] / 40)
+
+    # |H|^2 of a peaking biquad is proportional to
+    # (cos(w) - cos(w0))^2 + (x*sin(w))^2 with x = alpha*A above and alpha/A
+    # below the fraction line. The difference of cosines is written as a
+    # product of sines to stay accurate for low bands.
+    w = 2 * np.pi * freqs / sample_rate
+    cos_difference = -2 * np.sin((w + w0) / 2) * np.sin((w - w0) / 2)
+    sin_w_squared = np.sin(w) ** 2
+
+    numerator = cos_difference**2 + (alpha * A) ** 2 * sin_w_squared
+    denominator = cos_difference**2 + (alpha / A) ** 2 * sin_w_squared
+    return 10 * np.log10(np.prod(numerator / denominator, axis=-2))
+
+def calculate_eq_response_jacobian(freqs, center_freqs, gains, qs, sample_rate):
+    """
+    Calculate the EQ magnitude response (dB) and its analytic Jacobian.
+
+    The Jacobian has shape (frequencies x 3*bands) and holds the derivatives
+    with respect to log(frequency), gain (dB) and log(Q) of each band, in that
+    order per band.
+    """
+    freqs = np.asarray(freqs, dtype=float)
+    w0 = 2 * np.pi * np.asarray(center_freqs, dtype=float) / sample_rate
+    q = np.asarray(qs, dtype=float)
+    alpha = np.sin(w0) / (2 * q)
+    A = 10 ** (np.asarray(gains, dtype=float) / 40)
+
+    # Same closed form as calculate_eq_response() with x = u above and
+    # x = v below the fraction line
+    w = 2 * np.pi * freqs[:, None] / sample_rate
+    cos_difference = -2 * np.sin((w + w0) / 2) * np.sin((w - w0) / 2)
+    sin_w_squared = np.sin(w) ** 2
+    u = alpha * A
+    v = alpha / A
+
+    numerator = cos_difference**2 + u**2 * sin_w_squared
+    denominator = cos_difference**2 + v**2 * sin_w_squared
+    response = 10 * np.log10(np.prod(numerator / denominator, axis=1))
+
+    # Partial derivatives of both terms with respect to w0, u and v
+    d_w0 = 2 * cos_difference * np.sin(w0)
+    d_u = 2 * u * sin_w_squared
+    d_v = 2 * v * sin_w_squared
+
+    db_scale = 10 / np.log(10)
+    jacobian = np.empty((len(freqs), 3 * len(w0)))
+    jacobian[:, 0::3] = db_scale * w0 * ((d_w0 + d_u * A * np.cos(w0) / (2 * q)) / numerator
+                                         - (d_w0 + d_v * np.cos(w0) / (2 * q * A)) / denominator)
+    jacobian[:, 1::3] = db_scale * np.log(10) / 40 * (d_u * u / numerator + d_v * v / denominator)
+    jacobian[:, 2::3] = -db_scale * (d_u * u / numerator - d_v * v / denominator)
+    return response, jacobian
+
+def fit_eq_to_target(freqs, target_db, sample_rate=48000, n_bands=9,
+                     freq_range=(20, 20000), gain_range=(-12, 12), q_range=(0.1, 15)):
+    """
+    Fit the center frequencies, gains and Q factors of an N-band peaking EQ
+    to a target magnitude curve (dB) by least squares with analytic gradients.
+
+    The bands are first placed one at a time on the largest deviation left,
+    and after the joint fit the least useful band is moved to the largest
+    remaining deviation while that improves the fit. The parameter limits default to the ranges of the EQ sliders.
+    Returns (center_freqs, gains, qs) sorted by frequency.
+    """
+    order = np.argsort(freqs)
+    freqs = np.asarray(freqs, dtype=float)[order]
+    target_db = np.asarray(target_db, dtype=float)[order]
+    freq_range = (freq_range[0], min(freq_range[1], 0.49 * sample_rate))
+    lower = np.tile([np.log(freq_range[0]), gain_range[0], np.log(q_range[0])], n_bands)
+    upper = np.tile([np.log(freq_range[1]), gain_range[1], np.log(q_range[1])], n_bands)
+
+    def unpack(x):
+        return np.exp(x[0::3]), x[1::3], np.exp(x[2::3])
+
+    def residuals(x):
+        return calculate_eq_response(freqs, *unpack(x), sample_rate) - target_db
+
+    def jacobian(x):
+        return calculate_eq_response_jacobian(freqs, *unpack(x), sample_rate)[1]
+
+    def add_band(x):
+        # Put a new band on the largest remaining deviation, as wide as the
+        # deviation is down to half its height, and fit that band alone
+        remaining = -residuals(x)
+        peak = np.argmax(np.abs(remaining))
+        outside = np.nonzero(np.sign(remaining[peak]) * remaining < np.abs(remaining[peak]) / 2)[0]
+        f_low = freqs[outside[outside < peak].max(initial=0)]
+        f_high = freqs[outside[outside > peak].min(initial=len(freqs) - 1)]
+        band = np.clip([np.log(freqs[peak]), remaining[peak], np.log(freqs[peak] / max(f_high - f_low, 1e-9))],
+                       lower[:3], upper[:3])
+        band = scipy.optimize.least_squares(lambda b: residuals(np.concatenate([x, b])), band,
+                                            jac=lambda b: jacobian(np.concatenate([x, b]))[:, -3:],
+                                            bounds=(lower[:3], upper[:3]), x_scale='jac').x
+        return np.concatenate([x, band])
+
+    def fit(x):
+        return scipy.optimize.least_squares(residuals, x, jac=jacobian, bounds=(lower[:len(x)], upper[:len(x)]),
+                                            x_scale='jac')
+
+    # Place the bands one at a time, then fit them all together
+    x0 = np.empty(0)
+    for _ in range(n_bands):
+        x0 = add_band(x0)
+    result = fit(x0)
+
+    # Bands can end up doubled on one feature while another is missed. Drop
+    # the band that contributes least, refit the others and place it again on
+    # the largest deviation left, for as long as that improves the fit.
+    for _ in range(n_bands):
+        if np.abs(result.fun).max() < 0.01:
+            break
+        bands = result.x.reshape(n_bands, 3)
+        costs = [np.sum(residuals(np.delete(bands, k, axis=0).ravel())**2) for k in range(n_bands)]
+        candidate = fit(add_band(fit(np.delete(bands, np.argmin(costs), axis=0).ravel()).x))
+        if candidate.cost >= result.cost * (1 - 1e-6):
+            break
+        result = candidate
+    center_freqs, gains, qs = unpack(result.x)
+    order = np.argsort(center_freqs)
+    return center_freqs[order], gains[order], qs[order]
+
+def save_eq_preset(path, center_freqs, qs, gains, sample_rate):
+    """Write an EQ preset in the tab-separated EQ_data.csv layout."""
+    with open(path, 'w', newline='') as f:
+        f.write("frequencies\tqualityFactor\tpeakGain\tsampleRate\n")
+        for i, (freq, q, gain) in enumerate(zip(center_freqs, qs, gains)):
+            rate = sample_rate if i == 0 else 0
+            f.write(f"{freq:.6g}\t{q:.6g}\t{gain:.6g}\t{rate:g}\n")
+
+def load_eq_preset(path):
+    """
+    Read an EQ preset in the tab-separated EQ_data.csv layout.
+
+    Returns (center_freqs, qs, gains, sample_rate). The sample rate is taken
+    from the first row; the remaining rows leave it at 0.
+    """
+    data = np.loadtxt(path, delimiter='\t', skiprows=1, ndmin=2)
+    return data[:, 0], data[:, 1], data[:, 2], data[0, 3]
+
+def apply_eq_filters(signal, sample_rate, center_freqs, gains, qs, method='sos'):
+    """
+    Apply EQ filters to the input signal.
+
+    The signal may be a mono array or a (channels x samples) array, or any
+    stack of those, and is filtered along its last axis. The band parameters
+    are either shared by all channels or given per channel with shape
+    (channels x bands); channels with identical parameters are filtered
+    together in one call.
+
+    method='sos' runs every band in a single cascaded sosfilt() call,
+    method='lfilter' runs one lfilter() pass per band and method='fir' runs
+    the linear-phase FIR of FIREQProcessor, with its delay removed.
+    """
+    signal = np.asarray(signal)
+    center_freqs, gains, qs = np.broadcast_arrays(np.asarray(center_freqs, dtype=float),
+                                                  np.asarray(gains, dtype=float),
+                                                  np.asarray(qs, dtype=float))
+    if center_freqs.ndim > 1:
+        # Group the channels by parameter set and filter each group at once
+        n_bands = center_freqs.shape[-1]
+        params = np.stack([center_freqs, gains, qs], axis=-1)
+        params = np.broadcast_to(params, signal.shape[:-1] + (n_bands, 3)).reshape(-1, 3 * n_bands)
+        channels = signal.reshape(-1, signal.shape[-1])
+        filtered_channels = np.empty(channels.shape)
+        unique_params, groups = np.unique(params, axis=0, return_inverse=True)
+        groups = groups.ravel()
+        for i, row in enumerate(unique_params):
+            selected = groups == i
+            filtered_channels[selected] = apply_eq_filters(channels[selected], sample_rate,
+                                                           row[0::3], row[1::3], row[2::3], method)
+        return filtered_channels.reshape(signal.shape)
+
+    if method == 'sos':
+        if len(center_freqs) == 0:
+            return signal.copy()
+        with profiler.stage('apply_eq_filters', signal.shape[-1], sample_rate):
+            return scipy.signal.sosfilt(calculate_eq_sos(sample_rate, center_freqs, gains, qs), signal)
+    if method == 'fir':
+        processor = FIREQProcessor(sample_rate, center_freqs, gains, qs)
+        # Flush the filter with zeros and drop its delay so the output lines up with the input
+        padded = np.concatenate([signal, np.zeros(signal.shape[:-1] + (processor.latency,))], axis=-1)
+        return processor.process(padded)[..., processor.latency:]
+    if method != 'lfilter':
+        raise ValueError(f"Unknown EQ method: {method}")
+
     filtered_signal = signal.copy()
-    for f, g, q in zip(center_freqs, gains, qs):
-        w0 = 2 * np.pi * f / sample_rate
-        alpha = np.sin(w0) / (2 * q)
-        A = 10 ** (g / 40)
-        
-        b0 = 1 + alpha * A
-        b1 = -2 * np.cos(w0)
-        b2 = 1 - alpha * A
-        a0 = 1 + alpha / A
-        a1 = -2 * np.cos(w0)
-        a2 = 1 - alpha / A
-        
-        filtered_signal = scipy.signal.lfilter([b0, b1, b2], [a0, a1, a2], filtered_signal)
+    with profiler.stage('apply_eq_filters', signal.shape[-1], sample_rate):
+        for f, g, q in zip(center_freqs, gains, qs):
+            b, a = calculate_peaking_coefficients(f, g, q, sample_rate)
+            filtered_signal = scipy.signal.lfilter(b, a, filtered_signal)
     
     return filtered_signal
 
+
+# apply_eq_filters() for the UI: revisited slider positions reuse their earlier output
+cached_apply_eq_filters = ResultCache(apply_eq_filters, signals=('signal',))
+
+def compare_eq_methods(sample_rate, center_freqs, gains, qs, duration=10.0, repeats=5):
+    """
+    Measure the throughput of the 'lfilter', 'sos' and 'fir' EQ methods on white noise.
+
+    Returns a dict mapping each method to its best throughput in samples/sec.
+    The 'fir' time includes designing the filter.
+    """
+    signal = np.random.default_rng(0).standard_normal(int(sample_rate * duration))
+    throughput = {}
+    for method in ('lfilter', 'sos', 'fir'):
+        best = np.inf
+        for _ in range(repeats):
+            start = time.perf_counter()
+            apply_eq_filters(signal, sample_rate, center_freqs, gains, qs, method=method)
+            best = min(best, time.perf_counter() - start)
+        throughput[method] = len(signal) / best
+        print(f"{method:>8}: {throughput[method] / 1e6:8.2f} Msamples/s "
+              f"({throughput[method] / sample_rate:8.1f}x real time)")
+    print(f"sos speed-up: {throughput['sos'] / throughput['lfilter']:.2f}x")
+    print(f"fir speed-up over sos: {throughput['fir'] / throughput['sos']:.2f}x")
+    return throughput
+
+class EQProcessor:
+    """
+    Stateful EQ that processes a signal block by block.
+
+    The filter state of every band is carried from one call of process() to
+    the next, so feeding a signal in chunks of any size gives the same output
+    as a single apply_eq_filters() call over the whole signal.
+    """
+
+    def __init__(self, sample_rate, center_freqs, gains, qs):
+        self.sample_rate = sample_rate
+        self.sos = calculate_eq_sos(sample_rate, center_freqs, gains, qs)
+        self.reset()
+
+    def reset(self):
+        """Clear the filter state of every band."""
+        self.zi = None
+
+    def process(self, block):
+        """
+        Filter the next block of the signal and return the filtered block.
+
+        Blocks are mono or (channels x samples) arrays; the channel layout
+        must stay the same until the next reset().
+        """
+        block = np.asarray(block, dtype=float)
+        if len(self.sos) == 0:
+            return block.copy()
+        if self.zi is None:
+            self.zi = np.zeros((len(self.sos),) + block.shape[:-1] + (2,))
+        with profiler.stage('EQProcessor.process', block.shape[-1], self.sample_rate):
+            filtered_block, self.zi = scipy.signal.sosfilt(self.sos, block, zi=self.zi)
+        return filtered_block
+
+class BlockEQProcessor(EQProcessor):
+    """
+    EQProcessor for a fixed block size and channel count that allocates no sample buffers.
+
+    process() takes (channels x block_size) blocks and writes the filtered
+    block into a caller-provided output buffer, for use inside audio
+    callbacks. The output matches EQProcessor to rounding error.
+    """
+
+    def __init__(self, sample_rate, center_freqs, gains, qs, block_size, channels=1):
+        self.block_filter = None
+        super().__init__(sample_rate, center_freqs, gains, qs)
+        self.block_filter = BlockLinearFilter(self.sos, block_size, channels)
+
+    def reset(self):
+        """Clear the filter state of every band."""
+        super().reset()
+        if self.block_filter is not None:
+            self.block_filter.reset()
+
+    def process(self, block, out=None):
+        """Filter the next block into out (a new array if out is None)."""
+        if out is None:
+            out = np.empty(np.shape(block))
+        return self.block_filter.process(block, out)
+
+def linear_phase_eq_taps(sample_rate, center_freqs, gains, qs, min_taps=255, max_taps=131071):
+    """
+    Return the FIR length design_linear_phase_eq() needs to follow a set of bands.
+
+    The poles or zeros of a peaking band are f0 / (Q * 10^(|gain| / 40)) Hz
+    wide, and the FIR has to span about 3 * sample_rate divided by the
+    narrowest of these widths to follow its band within 0.1 dB (measured for
+    bands at 40 Hz-2 kHz with Q 0.7-15 and 3-12 dB of boost or cut). The
+    length is odd and limited to min_taps..max_taps; max_taps is 1.5 s of
+    delay at 44.1 kHz, and bands narrower than that allows are smoothed.
+    """
+    widths = (np.asarray(center_freqs, dtype=float) / np.asarray(qs, dtype=float)
+              / 10 ** (np.abs(np.asarray(gains, dtype=float)) / 40))
+    num_taps = 3 * sample_rate / widths.min() if widths.size else min_taps
+    return int(np.clip(num_taps, min_taps, max_taps)) | 1
+
+
+def design_linear_phase_eq(sample_rate, center_freqs, gains, qs, num_taps=None):
+    """
+    Design one linear-phase FIR with the magnitude response of the whole EQ.
+
+    The target is the magnitude calculate_eq_response() draws, sampled on a
+    uniform grid and turned into a symmetric filter by frequency sampling
+    (scipy.signal.firwin2()). num_taps is rounded up to an odd number, so the
+    filter delays the signal by a whole (num_taps - 1) / 2 samples. Its
+    frequency resolution is about sample_rate / num_taps, so the length a
+    band needs grows with its Q and gain and falls with its frequency: at
+    44.1 kHz, 8191 taps follow 31 bands from 31 Hz within 0.03 dB at Q 1.41
+    but are 1 dB off at Q 4.3 and 4 dB off at Q 15. By default num_taps is
+    chosen by linear_phase_eq_taps().
+    """
+    if num_taps is None:
+        num_taps = linear_phase_eq_taps(sample_rate, center_freqs, gains, qs)
+    num_taps |= 1
+    grid = np.linspace(0, sample_rate / 2, 1 + 2 ** int(np.ceil(np.log2(num_taps))))
+    gain = 10 ** (calculate_eq_response(grid, center_freqs, gains, qs, sample_rate) / 20)
+    return scipy.signal.firwin2(num_taps, grid, gain, fs=sample_rate, window=('tukey', 0.1))
+
+
+class FIREQProcessor:
+    """
+    Linear-phase EQ that processes a signal block by block.
+
+    All bands are applied at once by the FIR from design_linear_phase_eq(),
+    using overlap-save FFT convolution: every FFT frame holds the last
+    num_taps - 1 input samples followed by up to `hop` new ones, and the
+    new part of the circular convolution is exactly the filter output. The
+    cost per sample does not depend on the number of bands. Blocks of any
+    size (mono or (channels x samples)) can be fed to process(); each call
+    returns as many samples as it receives, delayed by a constant `latency`
+    of (num_taps - 1) / 2 samples. Blocks of at least `hop` samples keep
+    the FFTs fully used.
+    """
+
+    def __init__(self, sample_rate, center_freqs, gains, qs, num_taps=None, fft_size=None):
+        self.sample_rate = sample_rate
+        self.fir = design_linear_phase_eq(sample_rate, center_freqs, gains, qs, num_taps)
+        self.history = len(self.fir) - 1
+        self.latency = self.history // 2
+        # About 8 times the filter length keeps the FFT cost per output sample near its minimum
+        self.fft_size = fft_size or scipy.fft.next_fast_len(8 * len(self.fir), real=True)
+        self.hop = self.fft_size - self.history
+        self.fir_spectrum = scipy.fft.rfft(self.fir, self.fft_size)
+        self.reset()
+
+    def reset(self):
+        """Clear the input history."""
+        self.frame = None
+
+    def process(self, block):
+        """
+        Filter the next block of the signal and return the filtered block.
+
+        The channel layout must stay the same until the next reset().
+        """
+        block = np.asarray(block, dtype=float)
+        if self.frame is None:
+            self.frame = np.zeros(block.shape[:-1] + (self.fft_size,))
+        history = self.history
+        output = np.empty(block.shape)
+        with profiler.stage('FIREQProcessor.process', block.shape[-1], self.sample_rate):
+            for start in range(0, block.shape[-1], self.hop):
+                chunk = block[..., start:start + self.hop]
+                length = chunk.shape[-1]
+                # Samples after the new ones only wrap into outputs that are discarded
+                self.frame[..., history:history + length] = chunk
+                spectrum = scipy.fft.rfft(self.frame, axis=-1)
+                spectrum *= self.fir_spectrum
+                filtered = scipy.fft.irfft(spectrum, self.fft_size, axis=-1)
+                output[..., start:start + length] = filtered[..., history:history + length]
+                self.frame[..., :history] = self.frame[..., length:length + history]
+        return output
+
 def plot_eq_response():
+    # Only the UIs import matplotlib
+    import matplotlib.pyplot as plt
+    from matplotlib.widgets import Slider, TextBox
+    from matplotlib.gridspec import GridSpec
+    from Audio_blit import BlitManager
+
     # Initial parameters
     sample_rate = 44100
     frequencies = [80, 500, 1000, 2000, 3000, 4000]
@@ -61,38 +599,24 @@ def plot_eq_response():
     # Calculate frequency points for plotting
     freq_points = np.logspace(np.log10(20), np.log10(20000), 1000)
 
-    def calculate_response(freqs, center_freqs, gains, qs):
-        magnitudes = np.ones_like(freqs)
-        for f, q, g in zip(center_freqs, qs, gains):
-            w0 = 2 * np.pi * f / sample_rate
-            alpha = np.sin(w0) / (2 * q)
-            A = 10 ** (g / 40)
-            b0 = 1 + alpha * A
-            b1 = -2 * np.cos(w0)
-            b2 = 1 - alpha * A
-            a0 = 1 + alpha / A
-            a1 = -2 * np.cos(w0)
-            a2 = 1 - alpha / A
-            w, h = scipy.signal.freqz([b0, b1, b2], [a0, a1, a2], worN=freqs, fs=sample_rate)
-            magnitudes *= np.abs(h)
-        return 20 * np.log10(magnitudes)
-
     # Initial response
-    initial_response = calculate_response(freq_points, frequencies, initial_gains, q_factors)
+    initial_response = calculate_eq_response(freq_points, frequencies, initial_gains, q_factors, sample_rate)
     response_line, = ax_freq.semilogx(freq_points, initial_response, 'b-', linewidth=2)
     
     # Plot initial signal
     filtered_signal = apply_eq_filters(test_signal, sample_rate, frequencies, initial_gains, q_factors)
     signal_line, = ax_signal.plot(time, test_signal, 'b-', alpha=0.5, label='Original')
     filtered_line, = ax_signal.plot(time, filtered_signal, 'r-', label='Filtered')
-    ax_signal.legend()
+    ax_signal.legend(loc='center right')
     ax_signal.set_title('Signal Waveform')
     ax_signal.set_xlabel('Time (s)')
     ax_signal.set_ylabel('Amplitude')
     
     # Plot initial spectrum
-    orig_freqs, orig_spectrum = calculate_spectrum(test_signal, sample_rate)
-    filt_freqs, filt_spectrum = calculate_spectrum(filtered_signal, sample_rate)
+    # 1/24-octave bands: a few hundred points instead of one per FFT bin
+    analyzer = SpectrumAnalyzer(sample_rate, bins_per_octave=24)
+    orig_freqs, orig_spectrum = analyzer.analyze(test_signal)
+    filt_freqs, filt_spectrum = analyzer.analyze(filtered_signal)
     spectrum_orig_line, = ax_spectrum.semilogx(orig_freqs, orig_spectrum, 'b-', alpha=0.5, label='Original')
     spectrum_filt_line, = ax_spectrum.semilogx(filt_freqs, filt_spectrum, 'r-', label='Filtered')
     ax_spectrum.grid(True, which="both", ls="-", alpha=0.6)
@@ -101,7 +625,7 @@ def plot_eq_response():
     ax_spectrum.set_ylim(-50, 100)
     ax_spectrum.set_xlabel('Frequency (Hz)')
     ax_spectrum.set_ylabel('Magnitude (dB)')
-    ax_spectrum.legend()
+    ax_spectrum.legend(loc='upper right')
     
     # Plot settings for EQ response
     ax_freq.grid(True, which="both", ls="-", alpha=0.6)
@@ -171,48 +695,71 @@ def plot_eq_response():
         slider_q = Slider(ax_slider_q, 'Q', 0.1, 15, valinit=q)
         sliders_q.append(slider_q)
 
-    def update_response():
+    def compute_response(params):
+        # Runs on the background worker thread
+        frequencies, gains, q_factors = params
+        with profiler.stage('eq_ui.dsp'):
+            # Update frequency response
+            new_response = calculate_eq_response(freq_points, frequencies, gains, q_factors, sample_rate)
+
+            # Update filtered signal
+            new_filtered_signal = cached_apply_eq_filters(test_signal, sample_rate, frequencies, gains, q_factors)
+
+            # Update spectrum
+            _, new_filt_spectrum = analyzer.analyze(new_filtered_signal)
+        return new_response, new_filtered_signal, new_filt_spectrum
+
+    def show_response(params, result):
+        frequencies, _, _ = params
+        new_response, new_filtered_signal, new_filt_spectrum = result
+        with profiler.stage('eq_ui.set_ydata'):
+            response_line.set_ydata(new_response)
+            filtered_line.set_ydata(new_filtered_signal)
+            spectrum_filt_line.set_ydata(new_filt_spectrum)
+
+            for line, freq in zip(freq_lines, frequencies):
+                line.set_xdata([freq, freq])
+
+    # Only the lines, slider parts and frequency texts change; everything
+    # else is drawn once and blitted from a cached background
+    # The legends are redrawn after the lines to stay on top of them. They
+    # have fixed locations: loc='best' would search all line data on every blit.
+    plot_artists = ([response_line, filtered_line, spectrum_filt_line] + freq_lines
+                    + [ax_signal.get_legend(), ax_spectrum.get_legend()])
+    blit = BlitManager(fig.canvas, plot_artists + [textbox.text_disp for textbox in textboxes_freq])
+    slider_artists = {slider: blit.add_slider(slider) for slider in sliders_gain + sliders_q}
+    for slider, textbox in zip(sliders_freq, textboxes_freq):
+        slider_artists[slider] = blit.add_slider(slider) + [textbox.text_disp]
+
+    worker = DebouncedWorker(fig.canvas, compute_response, show_response, redraw=lambda: blit.update(plot_artists))
+
+    @profiler.timed('eq_ui.update_response')
+    def update_response(slider=None):
         current_gains[:] = [s.val for s in sliders_gain]
         current_frequencies[:] = [10**s.val for s in sliders_freq]
         current_q_factors[:] = [s.val for s in sliders_q]
-        
-        # Update frequency response
-        new_response = calculate_response(freq_points, current_frequencies, current_gains, current_q_factors)
-        response_line.set_ydata(new_response)
-
-        # Update filtered signal
-        new_filtered_signal = apply_eq_filters(test_signal, sample_rate, 
-                                             current_frequencies, current_gains, current_q_factors)
-        filtered_line.set_ydata(new_filtered_signal)
-        
-        # Update spectrum
-        _, new_filt_spectrum = calculate_spectrum(new_filtered_signal, sample_rate)
-        spectrum_filt_line.set_ydata(new_filt_spectrum)
-
-        # Update frequency display text and textboxes
-        for i, (slider, textbox) in enumerate(zip(sliders_freq, textboxes_freq)):
-            freq = 10**slider.val
-            slider.valtext.set_text(f'{freq:.1f} Hz')
-            if textbox.text != str(int(freq)):
-                textbox.set_val(str(int(freq)))
-        
-        for line, freq in zip(freq_lines, current_frequencies):
-            line.set_xdata([freq, freq])
-        
-        fig.canvas.draw_idle()
 
-    def slider_freq_update(val, index):
-        freq = 10**sliders_freq[index].val
-        textboxes_freq[index].set_val(str(int(freq)))
-        update_response()
+        # The DSP runs in the background; only the newest slider state is computed
+        worker.submit((current_frequencies[:], current_gains[:], current_q_factors[:]))
+
+        with profiler.stage('eq_ui.text'):
+            # Update frequency display text and textboxes. The textbox text is
+            # set directly: TextBox.set_val() redraws the whole figure and
+            # fires its submit callback.
+            for slider_freq, textbox in zip(sliders_freq, textboxes_freq):
+                freq = 10**slider_freq.val
+                slider_freq.valtext.set_text(f'{freq:.1f} Hz')
+                textbox.text_disp.set_text(str(round(freq)))
 
-    for i, slider in enumerate(sliders_freq):
-        slider.on_changed(lambda val, idx=i: slider_freq_update(val, idx))
+        with profiler.stage('eq_ui.blit'):
+            blit.update(slider_artists.get(slider))
 
-    for slider in sliders_gain + sliders_q:
-        slider.on_changed(lambda _: update_response())
+    for slider in sliders_gain + sliders_freq + sliders_q:
+        slider.on_changed(lambda _, slider=slider: update_response(slider))
 
     plt.subplots_adjust(bottom=0.15)
+    profiler.instrument_canvas(fig.canvas, 'eq_ui.draw')
     plt.show()
 
-plot_eq_response()
\ No newline at end of file
+if __name__ == "__main__":
+    plot_eq_response()
@@ -0,0 +1,156 @@
+import atexit
+import os
+import threading
+import time
+from functools import wraps
+
+
+class _NullStage:
+    """Context manager that does nothing; returned by a disabled profiler."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, profiler, name, samples, sample_rate):
+        self.profiler = profiler
+        self.name = name
+        self.samples = samples
+        self.sample_rate = sample_rate
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, time.perf_counter() - self.start, self.samples, self.sample_rate)
+        return False
+
+
+class StageProfiler:
+    """
+    Opt-in wall-clock timing of named processing and UI stages.
+
+    Code marks its stages with `with profiler.stage('name'):` or the
+    @profiler.timed('name') decorator. While the profiler is disabled (the
+    default) stage() returns a shared do-nothing context manager, so the
+    only cost is one attribute check per stage. Once enabled, every stage
+    records its call count and total/max time. A stage given the number of
+    samples it processed and their sample rate also records its real-time
+    factor (audio duration / processing time) per call.
+
+    Stages may be recorded from several threads at once (the UI workers and
+    the band threads of MultibandCompressor); the statistics are updated
+    under a lock.
+
+    Setting the AUDIO_PROFILE environment variable enables the module-level
+    `profiler` at import time and prints its summary when Python exits.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        with self._lock:
+            self._stats = {}
+
+    def stage(self, name, samples=None, sample_rate=None):
+        """Return a context manager timing the stage `name`."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, samples, sample_rate)
+
+    def timed(self, name):
+        """Decorator timing every call of a function as the stage `name`."""
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with _Stage(self, name, None, None):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def instrument_canvas(self, canvas, name):
+        """
+        Time every full redraw of a matplotlib canvas as the stage `name`.
+
+        draw_idle() only schedules a redraw, so this is where the drawing
+        time of a UI update shows up. Does nothing while disabled.
+        """
+        if not self.enabled:
+            return
+        draw = canvas.draw
+
+        def timed_draw(*args, **kwargs):
+            with self.stage(name):
+                return draw(*args, **kwargs)
+        canvas.draw = timed_draw
+
+    def record(self, name, elapsed, samples=None, sample_rate=None):
+        """Add one call of `elapsed` seconds to the stage `name`."""
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = {'calls': 0, 'total': 0.0, 'max': 0.0, 'audio': 0.0,
+                                             'realtime_factor': None, 'min_realtime_factor': None}
+            stats['calls'] += 1
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+            if samples is not None and sample_rate and elapsed > 0:
+                realtime_factor = samples / sample_rate / elapsed
+                stats['audio'] += samples / sample_rate
+                stats['realtime_factor'] = realtime_factor
+                if stats['min_realtime_factor'] is None or realtime_factor < stats['min_realtime_factor']:
+                    stats['min_realtime_factor'] = realtime_factor
+
+    def stats(self):
+        """
+        Return {stage: statistics} for every recorded stage.
+
+        The statistics are calls, total, mean and max time in seconds and,
+        for stages that were given their samples, the real-time factor of
+        the last call, the worst call and the whole stage.
+        """
+        with self._lock:
+            recorded = {name: dict(stats) for name, stats in self._stats.items()}
+        result = {}
+        for name, stats in recorded.items():
+            entry = dict(stats, mean=stats['total'] / stats['calls'])
+            entry['overall_realtime_factor'] = stats['audio'] / stats['total'] if stats['audio'] else None
+            result[name] = entry
+        return result
+
+    def summary(self):
+        """Return the statistics as a table, slowest stages first."""
+        lines = [f"{'stage':<40} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'RTF':>9} {'min RTF':>9}"]
+        for name, stats in sorted(self.stats().items(), key=lambda item: -item[1]['total']):
+            realtime_factor = (f"{stats['overall_realtime_factor']:9.1f} {stats['min_realtime_factor']:9.1f}"
+                               if stats['overall_realtime_factor'] else f"{'':>9} {'':>9}")
+            lines.append(f"{name:<40} {stats['calls']:>7} {stats['total'] * 1000:10.2f} "
+                         f"{stats['mean'] * 1000:9.3f} {stats['max'] * 1000:9.3f} {realtime_factor}")
+        return '\n'.join(lines)
+
+
+profiler = StageProfiler()
+
+if os.environ.get('AUDIO_PROFILE'):
+    profiler.enable()
+    atexit.register(lambda: print(profiler.summary()))
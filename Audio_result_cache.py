@@ -0,0 +1,131 @@
+import inspect
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of the outputs of a processing function.
+
+    Calls are keyed on the identity of the signal arguments (named in
+    `signals`) and on the values of all other arguments, with floats
+    rounded to `significant_digits` significant digits. Slider positions
+    that differ by less than that share one result, which is the one
+    computed for the first of them. Signals are not hashed, so they must
+    not be modified in place while they are cached; entries for a signal
+    are dropped once it is garbage collected.
+
+    The cache holds at most `max_bytes` of result arrays and evicts the
+    least recently used results first. Cached arrays are made read-only,
+    since every hit returns the same arrays. stats() reports the hits,
+    misses and hit rate.
+    """
+
+    def __init__(self, function, signals=(), max_bytes=128 * 2**20, significant_digits=3):
+        self.function = function
+        self.signals = tuple(signals)
+        self.max_bytes = max_bytes
+        self.significant_digits = significant_digits
+        self._signature = inspect.signature(function)
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+        self._watched = set()
+        self.clear()
+
+    def clear(self):
+        """Drop all results and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Return the hits, misses, hit rate, evictions, number of entries and bytes held."""
+        with self._lock:
+            calls = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / calls if calls else None,
+                    'evictions': self.evictions, 'entries': len(self._entries),
+                    'bytes': self.bytes, 'max_bytes': self.max_bytes}
+
+    def _quantize(self, value):
+        if isinstance(value, (bool, int, str, type(None), np.bool_, np.integer)):
+            return value
+        if isinstance(value, (float, np.floating)):
+            return float(f'{value:.{self.significant_digits}g}')
+        if isinstance(value, (list, tuple)):
+            return tuple(self._quantize(item) for item in value)
+        if isinstance(value, np.ndarray):
+            return value.shape, self._quantize(value.tolist())
+        return value
+
+    def _forget(self, signal_id):
+        # Called when a cached signal is garbage collected
+        with self._lock:
+            self._watched.discard(signal_id)
+            for key in [key for key in self._entries if signal_id in key[0]]:
+                self.bytes -= self._sizes.pop(key)
+                del self._entries[key]
+
+    def _key(self, args, kwargs):
+        """Return the cache key of a call, or None if it cannot be cached."""
+        bound = self._signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        signal_ids = []
+        params = []
+        for name, value in bound.arguments.items():
+            if name in self.signals:
+                if not isinstance(value, np.ndarray):
+                    return None
+                signal_ids.append(id(value))
+                if id(value) not in self._watched:
+                    self._watched.add(id(value))
+                    weakref.finalize(value, self._forget, id(value))
+            else:
+                params.append((name, self._quantize(value)))
+        return tuple(signal_ids), tuple(params)
+
+    @staticmethod
+    def _freeze(result):
+        """Make the arrays of a result read-only and return their total size."""
+        if isinstance(result, np.ndarray):
+            result.setflags(write=False)
+            return result.nbytes
+        if isinstance(result, (list, tuple)):
+            return sum(ResultCache._freeze(item) for item in result)
+        return 0
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            key = self._key(args, kwargs)
+            if key is None:
+                self.misses += 1
+                return self.function(*args, **kwargs)
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+
+        # Compute outside the lock so other threads can read the cache meanwhile
+        result = self.function(*args, **kwargs)
+        size = self._freeze(result)
+        if size > self.max_bytes:
+            return result
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = result
+                self._sizes[key] = size
+                self.bytes += size
+            while self.bytes > self.max_bytes:
+                evicted, _ = self._entries.popitem(last=False)
+                self.bytes -= self._sizes.pop(evicted)
+                self.evictions += 1
+        return result
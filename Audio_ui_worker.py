@@ -0,0 +1,87 @@
+import threading
+import traceback
+
+
+class DebouncedWorker:
+    """
+    Run the DSP of a slider UI on a background thread, newest parameters only.
+
+    Slider callbacks call submit() with the current parameters, which only
+    records them. A worker thread repeatedly takes the latest recorded
+    parameters and runs compute(params) on them; parameters that were
+    replaced before the worker got to them are never computed. matplotlib
+    is not thread safe, so finished results are handed back to the GUI
+    thread by a canvas timer that calls apply(params, result) followed by
+    redraw() (canvas.draw_idle() by default). Slider events therefore cost
+    the same however long the signal is, and the plot shows the newest
+    result once it is ready.
+
+    An exception raised by compute() does not stop the worker: it is handed
+    to on_error(params, exception) on the GUI thread (by default its
+    traceback is printed), the plot keeps its last result and the next
+    parameters are computed as usual.
+    """
+
+    def __init__(self, canvas, compute, apply, interval_ms=16, redraw=None, on_error=None):
+        self.canvas = canvas
+        self.compute = compute
+        self.apply = apply
+        self.redraw = redraw or canvas.draw_idle
+        self.on_error = on_error or self._print_error
+        self._condition = threading.Condition()
+        self._pending = None
+        self._result = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+        self._timer = canvas.new_timer(interval=interval_ms)
+        self._timer.add_callback(self._poll)
+        self._timer.start()
+        canvas.mpl_connect('close_event', lambda event: self.close())
+
+    def submit(self, params):
+        """Record params as the newest state to compute, replacing any that are still waiting."""
+        with self._condition:
+            self._pending = params
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                params, self._pending = self._pending, None
+            try:
+                finished = (params, self.compute(params), None)
+            except Exception as error:
+                finished = (params, None, error)
+            with self._condition:
+                self._result = finished
+
+    @staticmethod
+    def _print_error(params, error):
+        print(f"Processing {params!r} failed:")
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+    def _poll(self):
+        # Runs on the GUI thread
+        with self._condition:
+            finished, self._result = self._result, None
+        if finished is None:
+            return
+        params, result, error = finished
+        if error is not None:
+            self.on_error(params, error)
+            return
+        self.apply(params, result)
+        self.redraw()
+
+    def close(self):
+        """Stop the worker thread and the timer; waiting parameters are dropped."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._timer.stop()
@@ -0,0 +1,225 @@
+import struct
+import numpy as np
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Plain RIFF sizes are 32-bit
+MAX_DATA_SIZE = 0xFFFFFFFF - 36
+
+# Sample format name -> (WAV format tag, bits per sample, numpy dtype of one sample)
+# 24-bit samples have no numpy dtype and are unpacked from their 3 bytes.
+SAMPLE_FORMATS = {
+    'uint8': (WAVE_FORMAT_PCM, 8, np.dtype('u1')),
+    'int16': (WAVE_FORMAT_PCM, 16, np.dtype('<i2')),
+    'int24': (WAVE_FORMAT_PCM, 24, None),
+    'int32': (WAVE_FORMAT_PCM, 32, np.dtype('<i4')),
+    'float32': (WAVE_FORMAT_IEEE_FLOAT, 32, np.dtype('<f4')),
+    'float64': (WAVE_FORMAT_IEEE_FLOAT, 64, np.dtype('<f8')),
+}
+
+
+def pcm_to_float(data, sample_format, dtype=np.float64):
+    """
+    Convert raw samples of the given sample format to floats in [-1, 1).
+
+    int24 data is a (..., 3) array of little-endian bytes.
+    """
+    if sample_format == 'int24':
+        # Put the 3 bytes in the top of an int32 so the sign comes for free
+        padded = np.zeros(data.shape[:-1] + (4,), dtype=np.uint8)
+        padded[..., 1:] = data
+        return padded.view('<i4')[..., 0].astype(dtype) / 2 ** 31
+    if sample_format.startswith('float'):
+        return data.astype(dtype)
+    if sample_format == 'uint8':
+        return (data.astype(dtype) - 128) / 128
+    return data.astype(dtype) / 2 ** (SAMPLE_FORMATS[sample_format][1] - 1)
+
+
+def float_to_pcm(data, sample_format):
+    """
+    Convert floats in [-1, 1) to raw samples of the given sample format.
+
+    int24 samples are returned as a (..., 3) array of little-endian bytes.
+    """
+    if sample_format.startswith('float'):
+        return data.astype(SAMPLE_FORMATS[sample_format][2])
+    if sample_format == 'uint8':
+        return np.clip(np.round(data * 128 + 128), 0, 255).astype(np.uint8)
+    scale = 2 ** (SAMPLE_FORMATS[sample_format][1] - 1)
+    samples = np.clip(np.round(data * scale), -scale, scale - 1)
+    if sample_format == 'int24':
+        return samples.astype('<i4')[..., None].view(np.uint8)[..., :3]
+    return samples.astype(SAMPLE_FORMATS[sample_format][2])
+
+
+class WavReader:
+    """
+    Memory-mapped reader for PCM (8/16/24/32-bit) and float (32/64-bit) WAV files.
+
+    Nothing but the header is read up front: read() and blocks() convert
+    only the requested frames to floats, and view() returns the raw samples
+    without copying them, so files far larger than RAM can be processed.
+    Chunks of samples are returned as (channels x samples) arrays, or 1-D
+    arrays for mono files, which is the layout the DSP functions expect.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            riff, _, wave = struct.unpack('<4sI4s', file.read(12))
+            if riff != b'RIFF' or wave != b'WAVE':
+                raise ValueError(f"{path} is not a RIFF/WAVE file")
+            fmt = None
+            while True:
+                header = file.read(8)
+                if len(header) < 8:
+                    raise ValueError(f"{path} has no data chunk")
+                chunk_id, chunk_size = struct.unpack('<4sI', header)
+                if chunk_id == b'fmt ':
+                    fmt = file.read(chunk_size)
+                    file.seek(chunk_size % 2, 1)
+                elif chunk_id == b'data':
+                    data_offset = file.tell()
+                    break
+                else:
+                    # Chunks are word aligned
+                    file.seek(chunk_size + chunk_size % 2, 1)
+        if fmt is None:
+            raise ValueError(f"{path} has no fmt chunk before its data chunk")
+
+        format_tag, self.channels, self.sample_rate, _, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+        if format_tag == WAVE_FORMAT_EXTENSIBLE:
+            # The sub-format GUID starts with the actual format tag
+            format_tag = struct.unpack('<H', fmt[24:26])[0]
+        self.sample_format = next((name for name, (tag, size, _) in SAMPLE_FORMATS.items()
+                                   if tag == format_tag and size == bits), None)
+        if self.sample_format is None:
+            raise ValueError(f"Unsupported WAV format: tag {format_tag}, {bits} bits")
+
+        self.frames = chunk_size // block_align
+        dtype = SAMPLE_FORMATS[self.sample_format][2]
+        shape = (self.frames, self.channels) if dtype is not None else (self.frames, self.channels, 3)
+        self.data = np.memmap(path, dtype=dtype or np.uint8, mode='r', offset=data_offset, shape=shape)
+
+    @property
+    def duration(self):
+        """Length of the file in seconds."""
+        return self.frames / self.sample_rate
+
+    def close(self):
+        """Release the memory map."""
+        self.data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def view(self, start=0, stop=None):
+        """Return the raw (frames x channels) samples of [start, stop) without copying."""
+        return self.data[start:stop]
+
+    def read(self, start=0, stop=None, dtype=np.float64):
+        """Return frames [start, stop) as floats in [-1, 1)."""
+        samples = pcm_to_float(self.view(start, stop), self.sample_format, dtype).T
+        return samples[0] if self.channels == 1 else samples
+
+    def blocks(self, block_size=65536, dtype=np.float64):
+        """Yield the whole file as consecutive float blocks of block_size frames."""
+        for start in range(0, self.frames, block_size):
+            yield self.read(start, start + block_size, dtype)
+
+
+class WavWriter:
+    """
+    Incremental WAV writer.
+
+    Every write() appends a (channels x samples) float block (1-D for mono)
+    to the file, so the output never has to be held in memory; the sizes in
+    the header are filled in by close(). Plain RIFF is limited to 4 GiB of
+    sample data.
+    """
+
+    def __init__(self, path, sample_rate, channels, sample_format='int16'):
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unknown sample format: {sample_format}")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.frames = 0
+
+        format_tag, bits, _ = SAMPLE_FORMATS[sample_format]
+        self.block_align = channels * bits // 8
+        self.file = open(path, 'wb')
+        self.file.write(struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 0, b'WAVE', b'fmt ', 16, format_tag, channels,
+                                    sample_rate, sample_rate * self.block_align, self.block_align, bits,
+                                    b'data', 0))
+        self.data_offset = self.file.tell()
+
+    def write(self, block):
+        """Append a block of float samples in [-1, 1)."""
+        block = np.asarray(block)
+        frames = block.reshape(self.channels, -1).T if block.ndim == 1 else block.T
+        if (self.frames + len(frames)) * self.block_align > MAX_DATA_SIZE:
+            raise ValueError(f"{self.path} would exceed the 4 GiB limit of a WAV file")
+        np.ascontiguousarray(float_to_pcm(frames, self.sample_format)).tofile(self.file)
+        self.frames += len(frames)
+
+    def close(self):
+        """Fill in the header sizes and close the file."""
+        if self.file is None:
+            return
+        data_size = self.frames * self.block_align
+        if data_size % 2:
+            self.file.write(b'\0')
+        self.file.seek(4)
+        self.file.write(struct.pack('<I', self.data_offset - 8 + data_size + data_size % 2))
+        self.file.seek(self.data_offset - 4)
+        self.file.write(struct.pack('<I', data_size))
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def process_wav(input_path, output_path, make_processor, block_size=65536, sample_format=None):
+    """
+    Run a block processor over a WAV file and write the result.
+
+    make_processor(sample_rate) must return an object whose process() takes
+    (channels x samples) blocks, like EQProcessor or DynamicsProcessor. A
+    processor with a `latency` attribute is flushed with that many zeros
+    and its output is shifted back into place. The input is memory-mapped
+    and the output written block by block, so only one block is held in
+    memory at a time. The output keeps the input sample format unless
+    sample_format is given. Returns the duration of the file in seconds.
+    """
+    with WavReader(input_path) as reader, \
+            WavWriter(output_path, reader.sample_rate, reader.channels,
+                      sample_format or reader.sample_format) as writer:
+        processor = make_processor(reader.sample_rate)
+        latency = getattr(processor, 'latency', 0)
+
+        def blocks():
+            yield from reader.blocks(block_size)
+            if latency:
+                yield np.zeros((reader.channels, latency) if reader.channels > 1 else latency)
+
+        skip = latency
+        for block in blocks():
+            processed = processor.process(block)
+            if skip:
+                trimmed = min(skip, processed.shape[-1])
+                processed = processed[..., trimmed:]
+                skip -= trimmed
+            writer.write(processed)
+        return reader.duration
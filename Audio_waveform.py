@@ -0,0 +1,101 @@
+import numpy as np
+
+
+class MinMaxPyramid:
+    """
+    Multi-resolution min/max envelope of a 1-D signal.
+
+    Level k holds the minimum and maximum of every block of factor**k
+    samples, so any span of the signal can be reduced to a given number of
+    min/max pairs by reading a level that is only slightly finer than
+    needed instead of the samples themselves. Building the pyramid takes
+    one pass over the signal and about 2/(factor-1) times its memory.
+    """
+
+    def __init__(self, signal, factor=4):
+        self.signal = np.asarray(signal)
+        self.factor = factor
+        # levels[k] = (block size, minima, maxima); level 0 is the signal itself
+        self.levels = [(1, self.signal, self.signal)]
+        minima = maxima = self.signal
+        block_size = 1
+        while len(minima) > factor:
+            starts = np.arange(0, len(minima), factor)
+            minima = np.minimum.reduceat(minima, starts)
+            maxima = np.maximum.reduceat(maxima, starts)
+            block_size *= factor
+            self.levels.append((block_size, minima, maxima))
+
+    def __len__(self):
+        return len(self.signal)
+
+    def envelope(self, start, stop, pixels):
+        """
+        Reduce samples [start, stop) to at most `pixels` min/max pairs.
+
+        Returns (positions, values): the sample index where every pair
+        starts, repeated for its minimum and maximum, and the alternating
+        minima and maxima. Spans short enough to draw directly are returned
+        sample by sample.
+        """
+        start = max(0, start)
+        stop = min(len(self.signal), stop)
+        pixels = max(1, pixels)
+        if stop - start <= 2 * pixels:
+            return np.arange(start, stop), self.signal[start:stop]
+
+        # Coarsest level whose blocks are still no wider than one pixel
+        samples_per_pixel = (stop - start) / pixels
+        block_size, minima, maxima = next(level for level in reversed(self.levels)
+                                          if level[0] <= samples_per_pixel)
+        first = start // block_size
+        last = -(-stop // block_size)
+        edges = np.unique(first + np.arange(pixels) * (last - first) // pixels)
+
+        positions = np.repeat(edges * block_size, 2)
+        values = np.empty(2 * len(edges), dtype=self.signal.dtype)
+        values[0::2] = np.minimum.reduceat(minima[first:last], edges - first)
+        values[1::2] = np.maximum.reduceat(maxima[first:last], edges - first)
+        return positions, values
+
+
+class WaveformLine:
+    """
+    Line of a long signal on a time axis, drawn as a per-pixel min/max envelope.
+
+    Only as many points as the axes is wide (in pixels) are handed to
+    matplotlib, so drawing and updating cost depends on the display width,
+    not on the signal length. The envelope is recomputed from the pyramid
+    for the visible time range whenever the x limits or the figure size
+    change.
+    """
+
+    def __init__(self, ax, signal, sample_rate, start_time=0.0, **line_kwargs):
+        self.ax = ax
+        self.sample_rate = sample_rate
+        self.start_time = start_time
+        self.pyramid = signal if isinstance(signal, MinMaxPyramid) else MinMaxPyramid(signal)
+        # Start with the envelope of the whole signal so that autoscaling sees all of it
+        self.line, = ax.plot(*self._envelope(0, len(self.pyramid)), **line_kwargs)
+        ax.callbacks.connect('xlim_changed', lambda ax: self.refresh())
+        ax.figure.canvas.mpl_connect('resize_event', lambda event: self.refresh())
+
+    def set_signal(self, signal):
+        """Show a new signal, given as an array or an already built MinMaxPyramid."""
+        self.pyramid = signal if isinstance(signal, MinMaxPyramid) else MinMaxPyramid(signal)
+        self.refresh()
+
+    @property
+    def duration(self):
+        return len(self.pyramid) / self.sample_rate
+
+    def _envelope(self, start, stop):
+        positions, values = self.pyramid.envelope(start, stop, int(self.ax.bbox.width))
+        return self.start_time + positions / self.sample_rate, values
+
+    def refresh(self):
+        """Recompute the envelope for the visible range."""
+        x_min, x_max = self.ax.get_xlim()
+        start = int(np.floor((x_min - self.start_time) * self.sample_rate))
+        stop = int(np.ceil((x_max - self.start_time) * self.sample_rate)) + 1
+        self.line.set_data(*self._envelope(start, stop))
@@ -1,70 +1,535 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.widgets import Slider
 import scipy.signal
-from matplotlib.gridspec import GridSpec
 
+from Audio_compressor_and_expander import (DynamicsProcessor, GainCurve, apply_expander_compressor,
+                                           get_gain_curve)
+from Audio_equalizer import SpectrumAnalyzer
+from Audio_profiler import profiler
+from Audio_result_cache import ResultCache
+from Audio_ui_worker import DebouncedWorker
 
-def apply_expander_compressor(input_db, expander_threshold_db, compressor_threshold_db, compressor_ratio, expander_ratio):
+
+# Magnitude floor, keeps log10() finite on silent bins
+MAGNITUDE_FLOOR = 1e-10
+
+
+def target_bin_slice(freqs, target_freq_range):
+    """Return the contiguous slice of frequency bins inside target_freq_range."""
+    start, stop = np.searchsorted(freqs, target_freq_range[0]), np.searchsorted(freqs, target_freq_range[1], side='right')
+    return slice(start, max(start, stop))
+
+
+def magnitude_db(spectrum, scale=1.0):
+    """Return the floored magnitude of a complex spectrum in dB, in its real dtype."""
+    level_db = np.abs(spectrum)
+    if scale != 1.0:
+        level_db *= scale
+    np.maximum(level_db, MAGNITUDE_FLOOR, out=level_db)
+    np.log10(level_db, out=level_db)
+    level_db *= 20
+    return level_db
+
+
+def band_gain(level_db, expander_threshold, compressor_threshold, compressor_ratio, expander_ratio, out=None):
     """
-    Apply a combined expander and compressor transfer function with separate thresholds.
-    - Expand signals below the expander threshold using the expander ratio.
-    - Compress signals above the compressor threshold using the compressor ratio.
-    - Leave signals between the thresholds unchanged.
+    Return the linear gain for bins at level_db (dB), optionally into out.
+
+    Shared (scalar) parameters use the precomputed gain curve; per-channel
+    parameters broadcast over the trailing (frequency x frame) axes.
     """
-    output_db = np.copy(input_db)
+    # In the argument order of apply_expander_compressor() and get_gain_curve()
+    params = (compressor_threshold, compressor_ratio, expander_threshold, expander_ratio)
+    if all(np.ndim(p) == 0 for p in params):
+        return get_gain_curve(*(float(p) for p in params)).gain(level_db, out=out)
+
+    gain_db = apply_expander_compressor(level_db, *(np.asarray(p)[..., None, None] for p in params))
+    gain_db -= level_db
+    gain_db /= 20
+    return np.power(10, gain_db, out=out, dtype=level_db.dtype)
 
-    # Apply expansion for signals below the expander threshold
-    mask_expansion = input_db < expander_threshold_db
-    output_db[mask_expansion] = expander_threshold_db - (expander_threshold_db - input_db[mask_expansion]) * expander_ratio
 
-    # Apply compression for signals above the compressor threshold
-    mask_compression = input_db > compressor_threshold_db
-    output_db[mask_compression] = compressor_threshold_db + (input_db[mask_compression] - compressor_threshold_db) / compressor_ratio
+class BandAnalysis:
+    """
+    Cached STFT analysis of a signal for repeated band compression/expansion.
 
-    return output_db
+    The forward STFT of the input and the floored dB magnitude of the bins in
+    target_freq_range are computed once. Every render() call then only
+    multiplies a new real gain into the target bins and runs the inverse
+    STFT, which is what the interactive sliders need. With dtype=np.float32
+    the whole analysis runs in float32/complex64.
+    """
 
+    def __init__(self, input_signal, sample_rate, target_freq_range, nperseg=1024, dtype=np.float64):
+        self.sample_rate = sample_rate
+        self.nperseg = nperseg
+        input_signal = np.asarray(input_signal, dtype=dtype)
+        self.input_length = input_signal.shape[-1]
+
+        # Perform STFT to transform the signal into the frequency domain
+        f, t, self.Zxx = scipy.signal.stft(input_signal, fs=sample_rate, nperseg=nperseg)
+
+        # Identify the frequency bins corresponding to the target range
+        self.target_bins = target_bin_slice(f, target_freq_range)
+        self.target_db = magnitude_db(self.Zxx[..., self.target_bins, :])
+        self.Zxx_processed = np.empty_like(self.Zxx)
+        self.gain = np.empty_like(self.target_db)
+
+    def render(self, expander_threshold, compressor_threshold, compressor_ratio, expander_ratio, match_length=True):
+        """
+        Apply compression and expansion to the target bins and resynthesise.
+
+        With match_length the output is trimmed or zero-padded to the length
+        of the input signal.
+        """
+        with profiler.stage('BandAnalysis.gain'):
+            np.copyto(self.Zxx_processed, self.Zxx)
+            self.Zxx_processed[..., self.target_bins, :] *= band_gain(
+                self.target_db, expander_threshold, compressor_threshold, compressor_ratio, expander_ratio,
+                out=self.gain)
+
+        # Transform back to the time domain
+        with profiler.stage('BandAnalysis.istft', self.input_length, self.sample_rate):
+            _, processed_signal = scipy.signal.istft(self.Zxx_processed, fs=self.sample_rate, nperseg=self.nperseg)
 
-def apply_compression_expansion_frequency(input_signal, sample_rate, expander_threshold, compressor_threshold, compressor_ratio, expander_ratio, target_freq_range):
+        # Ensure processed signal length matches input
+        if match_length:
+            length = processed_signal.shape[-1]
+            if length > self.input_length:
+                processed_signal = processed_signal[..., :self.input_length]
+            elif length < self.input_length:
+                pad = [(0, 0)] * (processed_signal.ndim - 1) + [(0, self.input_length - length)]
+                processed_signal = np.pad(processed_signal, pad, mode='constant')
+        return processed_signal
+
+
+def apply_compression_expansion_frequency(input_signal, sample_rate, expander_threshold, compressor_threshold,
+                                          compressor_ratio, expander_ratio, target_freq_range, dtype=np.float64):
     """
     Apply compression and expansion only to a specific frequency range.
+
+    The input may be a mono array, a (channels x samples) array or a stack
+    of those, and is processed along its last axis. The thresholds and
+    ratios are scalars shared by all channels or arrays with one value per
+    channel. Only the target bins are touched: a real gain is computed for
+    them and multiplied into the complex spectrum in place. With
+    dtype=np.float32 the processing runs in float32/complex64.
+    Use BandAnalysis to process the same input repeatedly.
     """
     # Perform STFT to transform the signal into the frequency domain
-    f, t, Zxx = scipy.signal.stft(input_signal, fs=sample_rate, nperseg=1024)
-    
-    # Magnitude and phase of the frequency components
-    magnitude = np.abs(Zxx)
-    phase = np.angle(Zxx)
-
-    # Identify the frequency bins corresponding to the target range
-    target_bins = (f >= target_freq_range[0]) & (f <= target_freq_range[1])
-
-    # Apply compression/expansion only to the magnitude in the target range
-    magnitude[target_bins, :] = apply_expander_compressor(
-        20 * np.log10(magnitude[target_bins, :]),  # Convert magnitude to dB
-        expander_threshold, 
-        compressor_threshold, 
-        compressor_ratio, 
-        expander_ratio
-    )
-    
-    # Convert dB back to magnitude
-    magnitude[target_bins, :] = 10 ** (magnitude[target_bins, :] / 20)
+    f, t, Zxx = scipy.signal.stft(np.asarray(input_signal, dtype=dtype), fs=sample_rate, nperseg=1024)
 
-    # Reconstruct the frequency domain signal
-    Zxx_processed = magnitude * np.exp(1j * phase)
+    # Apply compression/expansion only to the bins in the target range
+    target = Zxx[..., target_bin_slice(f, target_freq_range), :]
+    level_db = magnitude_db(target)
+    target *= band_gain(level_db, expander_threshold, compressor_threshold, compressor_ratio, expander_ratio,
+                        out=level_db)
 
     # Transform back to the time domain
-    _, processed_signal = scipy.signal.istft(Zxx_processed, fs=sample_rate)
+    _, processed_signal = scipy.signal.istft(Zxx, fs=sample_rate)
     
     return processed_signal
 
 
+class StreamingBandProcessor:
+    """
+    Streaming version of apply_compression_expansion_frequency().
+
+    The signal is analysed with a square-root Hann window, every nperseg
+    samples with a hop of nperseg // 2, and resynthesised by weighted
+    overlap-add with the same window. Blocks of any size (mono or
+    (channels x samples)) can be fed to process(); each call returns exactly
+    as many samples as it receives. The output is delayed by a constant
+    `latency` of nperseg - 1 samples, and the memory used is bounded by the
+    frame size, not by the length of the stream.
+
+    Spectra are scaled like scipy.signal.stft(), so the thresholds mean the
+    same as in apply_compression_expansion_frequency().
+    """
+
+    def __init__(self, sample_rate, expander_threshold, compressor_threshold, compressor_ratio, expander_ratio,
+                 target_freq_range, nperseg=1024):
+        self.sample_rate = sample_rate
+        self.nperseg = nperseg
+        self.hop = nperseg // 2
+        self.latency = nperseg - 1
+        self.window = np.sqrt(scipy.signal.get_window('hann', nperseg))
+        self.scale = 1 / self.window.sum()
+
+        self.target_bins = target_bin_slice(np.fft.rfftfreq(nperseg, 1 / sample_rate), target_freq_range)
+
+        self.set_parameters(expander_threshold, compressor_threshold, compressor_ratio, expander_ratio)
+        self.reset()
+
+    def set_parameters(self, expander_threshold, compressor_threshold, compressor_ratio, expander_ratio):
+        """Change the thresholds and ratios; takes effect from the next frame."""
+        self.gain_curve = GainCurve(compressor_threshold, compressor_ratio, expander_threshold, expander_ratio)
+
+    def reset(self):
+        """Clear the analysis and overlap-add state."""
+        self.frame = None
+
+    def _allocate(self, channel_shape):
+        self.frame = np.zeros(channel_shape + (self.nperseg,))
+        self.overlap = np.zeros(channel_shape + (self.nperseg,))
+        self.output_hop = np.zeros(channel_shape + (self.hop,))
+        self.filled = 0
+
+    def _process_frame(self):
+        """Process the current frame and move the next finished hop to output_hop."""
+        with profiler.stage('StreamingBandProcessor.fft'):
+            spectrum = np.fft.rfft(self.frame * self.window)
+        with profiler.stage('StreamingBandProcessor.gain'):
+            target = spectrum[..., self.target_bins]
+            level_db = magnitude_db(target, self.scale)
+            target *= self.gain_curve.gain(level_db, out=level_db)
+
+        with profiler.stage('StreamingBandProcessor.ifft'):
+            self.overlap += np.fft.irfft(spectrum, self.nperseg) * self.window
+        self.output_hop[...] = self.overlap[..., :self.hop]
+        self.overlap[..., :-self.hop] = self.overlap[..., self.hop:]
+        self.overlap[..., -self.hop:] = 0
+        self.frame[..., :-self.hop] = self.frame[..., self.hop:]
+
+    def process(self, block):
+        """Process the next block and return the same number of (delayed) output samples."""
+        block = np.asarray(block, dtype=float)
+        if self.frame is None:
+            self._allocate(block.shape[:-1])
+        with profiler.stage('StreamingBandProcessor.process', block.shape[-1], self.sample_rate):
+            return self._process_block(block)
+
+    def _process_block(self, block):
+        output = np.empty(block.shape)
+
+        # The output hop always holds hop - 1 - filled samples not yet returned,
+        # starting at index filled + 1
+        position = 0
+        while position < block.shape[-1]:
+            take = min(self.hop - self.filled, block.shape[-1] - position)
+            start = self.nperseg - self.hop + self.filled
+            self.frame[..., start:start + take] = block[..., position:position + take]
+            if self.filled + take < self.hop:
+                output[..., position:position + take] = self.output_hop[..., self.filled + 1:self.filled + 1 + take]
+                self.filled += take
+            else:
+                output[..., position:position + take - 1] = self.output_hop[..., self.filled + 1:]
+                self._process_frame()
+                output[..., position + take - 1] = self.output_hop[..., 0]
+                self.filled = 0
+            position += take
+
+        return output
+
+def linkwitz_riley_sos(crossover_freq, sample_rate):
+    """
+    Return the (lowpass, highpass, allpass) SOS of a 4th-order Linkwitz-Riley crossover.
+
+    Each LR4 filter is a squared 2nd-order Butterworth. The lowpass and
+    highpass outputs sum to the allpass, which is used to keep the phase of
+    the other bands aligned with this crossover.
+    """
+    lowpass = scipy.signal.butter(2, crossover_freq, 'low', fs=sample_rate, output='sos')
+    highpass = scipy.signal.butter(2, crossover_freq, 'high', fs=sample_rate, output='sos')
+    a = lowpass[0, 3:]
+    allpass = np.concatenate([a[::-1], a])[None, :]
+    return np.vstack([lowpass, lowpass]), np.vstack([highpass, highpass]), allpass
+
+
+class MultibandCompressor:
+    """
+    N-band compressor/expander built on a Linkwitz-Riley crossover filterbank.
+
+    The crossover frequencies split the signal into len(crossover_freqs) + 1
+    bands: every crossover takes the lowpass of what is left above the
+    previous one. When the processed bands are summed, the sum of the bands
+    below each crossover goes through the allpass of that crossover, so all
+    bands stay in phase and every allpass runs once per block. With unity
+    gain the bands sum back to an allpass-filtered copy of the input, so the
+    magnitude response is flat.
+
+    Thresholds, ratios and time constants are scalars shared by all bands or
+    sequences with one value per band. Every band has its own
+    DynamicsProcessor; the band filtering, detector and gain stages run
+    concurrently in a thread pool of `workers` threads (numpy and scipy
+    release the GIL; by default one thread per band, up to the number of
+    CPUs, and no pool at all on a single CPU). The filterbank is IIR, so
+    there is no algorithmic latency.
+
+    Call close() (or use the processor as a context manager) to stop the
+    worker threads.
+    """
+
+    def __init__(self, sample_rate, crossover_freqs, compressor_thresholds_db, compressor_ratios,
+                 expander_thresholds_db, expander_ratios, attack_ms=5.0, release_ms=50.0,
+                 detector='peak', workers=None):
+        crossover_freqs = np.sort(np.atleast_1d(np.asarray(crossover_freqs, dtype=float)))
+        if np.any(crossover_freqs <= 0) or np.any(crossover_freqs >= sample_rate / 2):
+            raise ValueError("Crossover frequencies must lie between 0 and the Nyquist frequency")
+        self.sample_rate = sample_rate
+        self.crossover_freqs = crossover_freqs
+        self.n_bands = len(crossover_freqs) + 1
+        self.latency = 0
+
+        # Band k is the lowpass of crossover k; the allpasses are applied in combine()
+        crossovers = [linkwitz_riley_sos(f, sample_rate) for f in crossover_freqs]
+        self.split_sos = [highpass for _, highpass, _ in crossovers]
+        self.band_sos = [lowpass for lowpass, _, _ in crossovers]
+        self.allpass_sos = [allpass for _, _, allpass in crossovers]
+
+        def per_band(value):
+            return np.broadcast_to(value, (self.n_bands,))
+
+        self.detector = detector
+        self.band_parameters = list(zip(per_band(compressor_thresholds_db), per_band(compressor_ratios),
+                                        per_band(expander_thresholds_db), per_band(expander_ratios),
+                                        per_band(attack_ms), per_band(release_ms)))
+        self.processors = [self.band_processor(k, sample_rate) for k in range(self.n_bands)]
+        workers = workers or min(self.n_bands, os.cpu_count() or 1)
+        self.executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 and self.n_bands > 1 else None
+        self.reset()
+
+    def band_processor(self, k, sample_rate):
+        """Return a new DynamicsProcessor for band k running at sample_rate."""
+        ct, cr, et, er, at, rt = self.band_parameters[k]
+        return DynamicsProcessor(sample_rate, ct, cr, et, er, attack_ms=at, release_ms=rt, detector=self.detector)
+
+    def decimation_factor(self, k, bandwidth_factor=4.0):
+        """
+        Return the largest decimation factor that keeps band k intact.
+
+        The decimated band must still cover bandwidth_factor times the upper
+        crossover of the band; the LR4 lowpass is 48 dB down two octaves
+        above its crossover, so the default of 4 loses only that residue.
+        The top band always runs at the full rate.
+        """
+        if k == self.n_bands - 1:
+            return 1
+        return max(1, int(self.sample_rate / (2 * bandwidth_factor * self.crossover_freqs[k])))
+
+    def reset(self):
+        """Clear the filterbank and detector state."""
+        self.split_zi = None
+        for processor in self.processors:
+            processor.reset()
+
+    def close(self):
+        """Shut the worker threads down."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _split_residuals(self, block):
+        block = np.asarray(block, dtype=float)
+        if self.split_zi is None:
+            self.split_zi = [np.zeros((len(sos),) + block.shape[:-1] + (2,)) for sos in self.split_sos]
+            self.band_zi = [np.zeros((len(sos),) + block.shape[:-1] + (2,)) for sos in self.band_sos]
+            self.allpass_zi = [np.zeros((len(sos),) + block.shape[:-1] + (2,)) for sos in self.allpass_sos]
+
+        # The highpass chain is sequential: residuals[k] is what lies above crossover k - 1
+        self.residuals = [block]
+        for k, sos in enumerate(self.split_sos):
+            residual, self.split_zi[k] = scipy.signal.sosfilt(sos, self.residuals[k], zi=self.split_zi[k])
+            self.residuals.append(residual)
+
+    def _filter_band(self, k):
+        """Return band k, filtered out of its residual."""
+        if k == self.n_bands - 1:
+            return self.residuals[k]
+        band, self.band_zi[k] = scipy.signal.sosfilt(self.band_sos[k], self.residuals[k], zi=self.band_zi[k])
+        return band
+
+    def _process_band(self, k):
+        """Return band k, filtered out of its residual and compressed/expanded."""
+        return self.processors[k].process(self._filter_band(k))
+
+    def split(self, block):
+        """
+        Split the next block into a list of its bands, without any dynamics processing.
+
+        The bands are not phase aligned yet; combine() aligns and sums them.
+        """
+        self._split_residuals(block)
+        return [self._filter_band(k) for k in range(self.n_bands)]
+
+    def combine(self, bands):
+        """
+        Sum the (processed) bands of the last split block.
+
+        Before band k is added, the sum of the bands below it goes through
+        the allpass of crossover k, which aligns it with band k and every
+        band above.
+        """
+        output = np.array(bands[0], dtype=float)
+        for k in range(1, self.n_bands):
+            if k < self.n_bands - 1:
+                output, self.allpass_zi[k] = scipy.signal.sosfilt(self.allpass_sos[k], output,
+                                                                  zi=self.allpass_zi[k])
+            output += bands[k]
+        return output
+
+    def process(self, block):
+        """
+        Process the next block and return the recombined bands.
+
+        Blocks are mono or (channels x samples) arrays; the channel layout
+        must stay the same until the next reset().
+        """
+        with profiler.stage('MultibandCompressor.process', np.shape(block)[-1], self.sample_rate):
+            with profiler.stage('MultibandCompressor.split'):
+                self._split_residuals(block)
+            with profiler.stage('MultibandCompressor.bands'):
+                if self.executor is None:
+                    bands = [self._process_band(k) for k in range(self.n_bands)]
+                else:
+                    bands = [future.result() for future in
+                             [self.executor.submit(self._process_band, k) for k in range(self.n_bands)]]
+            with profiler.stage('MultibandCompressor.combine'):
+                return self.combine(bands)
+
+
+@lru_cache(maxsize=32)
+def resampling_filter(factor, half_length=4):
+    """
+    Return the polyphase anti-aliasing/interpolation filter for a rate change by factor.
+
+    Crossover bands are already band-limited well below the decimated
+    Nyquist frequency, so this is much shorter than the resample_poly()
+    default of 10 taps per phase.
+    """
+    return scipy.signal.firwin(2 * half_length * factor + 1, 1 / factor, window=('kaiser', 5.0))
+
+
+def apply_multiband_compression(input_signal, sample_rate, crossover_freqs, compressor_thresholds_db,
+                                compressor_ratios, expander_thresholds_db, expander_ratios, attack_ms=5.0,
+                                release_ms=50.0, detector='peak', multirate=False, bandwidth_factor=4.0):
+    """
+    Compress/expand a whole signal with a MultibandCompressor.
+
+    With multirate, every band below the top one is decimated by
+    MultibandCompressor.decimation_factor() with polyphase resampling, its
+    dynamics run at that lower rate and the result is interpolated back to
+    the full rate before the bands are summed. Only the crossover filters
+    and the top band run at the full rate.
+    """
+    input_signal = np.asarray(input_signal, dtype=float)
+    with MultibandCompressor(sample_rate, crossover_freqs, compressor_thresholds_db, compressor_ratios,
+                             expander_thresholds_db, expander_ratios, attack_ms=attack_ms, release_ms=release_ms,
+                             detector=detector, workers=1) as compressor:
+        if not multirate:
+            return compressor.process(input_signal)
+
+        bands = compressor.split(input_signal)
+        for k, band in enumerate(bands):
+            factor = compressor.decimation_factor(k, bandwidth_factor)
+            if factor == 1:
+                bands[k] = compressor.processors[k].process(band)
+                continue
+            processor = compressor.band_processor(k, sample_rate / factor)
+            window = resampling_filter(factor)
+            decimated = scipy.signal.resample_poly(band, 1, factor, axis=-1, window=window)
+            restored = scipy.signal.resample_poly(processor.process(decimated), factor, 1, axis=-1, window=window)
+            bands[k] = restored[..., :input_signal.shape[-1]]
+        return compressor.combine(bands)
+
+
+def compare_multirate(sample_rate=48000, duration=10.0, crossover_freqs=(120, 500, 4000), repeats=3,
+                      seeds=(0, 1, 2)):
+    """
+    Compare the multirate and full-rate apply_multiband_compression() on pink-ish noise.
+
+    The test signal is white noise through a one-pole lowpass (pole at
+    0.98), scaled by 0.02, processed with compressor -20 dB 4:1 and
+    expander -50 dB 2:1 in every band. Every seed is a different noise
+    segment. Prints and returns the best run time of both paths and the
+    lowest and highest error of the multirate output relative to the
+    full-rate output in dB.
+
+    The error depends on the segment, so a range is reported rather than
+    one number. At 48 kHz with crossovers at 120/500/4000 Hz it measured
+    -41.8 to -44.2 dB over 1-30 s segments, with a speed-up of 1.0-1.6x
+    that varied between runs.
+    """
+    params = (crossover_freqs, -20, 4, -50, 2)
+    times = {False: np.inf, True: np.inf}
+    errors_db = []
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        signal = scipy.signal.lfilter([1], [1, -0.98], rng.standard_normal(int(sample_rate * duration))) * 0.02
+        outputs = {}
+        for multirate in (False, True):
+            for _ in range(repeats):
+                start = time.perf_counter()
+                outputs[multirate] = apply_multiband_compression(signal, sample_rate, *params, multirate=multirate)
+                times[multirate] = min(times[multirate], time.perf_counter() - start)
+        error = outputs[True] - outputs[False]
+        errors_db.append(10 * np.log10(np.sum(error ** 2) / np.sum(outputs[False] ** 2)))
+
+    error_range = (min(errors_db), max(errors_db))
+    print(f"full rate: {times[False] * 1000:7.1f} ms, multirate: {times[True] * 1000:7.1f} ms "
+          f"({times[False] / times[True]:.2f}x), error {error_range[0]:.1f} to {error_range[1]:.1f} dB "
+          f"over {len(seeds)} segments of {duration:g} s")
+    return {'full_rate': times[False], 'multirate': times[True], 'error_db': error_range}
+
+
+def compare_band_methods(sample_rate=44100, duration=10.0, block_size=1024, channels=2, repeats=3):
+    """
+    Compare the STFT band processor with the 3-band crossover compressor.
+
+    Both process stereo noise block by block with the same thresholds and
+    ratios. Prints and returns a dict mapping each method to its best
+    throughput in samples/sec and its algorithmic latency in ms (the
+    block_size of input buffering comes on top of it for both).
+    """
+    signal = np.random.default_rng(0).standard_normal((channels, int(sample_rate * duration))) * 0.1
+    params = dict(expander_threshold=-40, compressor_threshold=-10, compressor_ratio=4, expander_ratio=2)
+    methods = {
+        'stft': lambda: StreamingBandProcessor(sample_rate, target_freq_range=(500, 2000), **params),
+        'crossover': lambda: MultibandCompressor(sample_rate, (500, 2000), params['compressor_threshold'],
+                                                 params['compressor_ratio'], params['expander_threshold'],
+                                                 params['expander_ratio']),
+    }
+
+    results = {}
+    for name, make_processor in methods.items():
+        processor = make_processor()
+        best = np.inf
+        for _ in range(repeats):
+            processor.reset()
+            start = time.perf_counter()
+            for position in range(0, signal.shape[-1], block_size):
+                processor.process(signal[:, position:position + block_size])
+            best = min(best, time.perf_counter() - start)
+        if hasattr(processor, 'close'):
+            processor.close()
+        throughput = signal.shape[-1] / best
+        latency_ms = 1000 * processor.latency / sample_rate
+        results[name] = {'throughput': throughput, 'latency_ms': latency_ms}
+        print(f"{name:>10}: {throughput / 1e6:6.2f} Msamples/s ({throughput / sample_rate:7.1f}x real time), "
+              f"latency {latency_ms:.1f} ms")
+    return results
+
+
 def interactive_audio_processor():
     """
     Interactive visualization combining audio signal processing and transfer function display.
     Shows time domain, frequency spectrum, and compressor/expander transfer function.
     """
+    import matplotlib.pyplot as plt
+    from matplotlib.widgets import Slider
+    from matplotlib.gridspec import GridSpec
+    from Audio_blit import BlitManager
+    from Audio_waveform import MinMaxPyramid, WaveformLine
+
     # Generate test input signal
     sample_rate = 44100
     t = np.linspace(0, 2, sample_rate * 2, endpoint=False)
@@ -77,23 +542,18 @@ def interactive_audio_processor():
     initial_expander_ratio = 2
     target_freq_range = (500, 2000)
 
+    # Analyse the input once; slider updates only re-render the target bins
+    analysis = BandAnalysis(input_signal, sample_rate, target_freq_range)
+    render = ResultCache(analysis.render)
+
     # Process initial signal
-    processed_signal = apply_compression_expansion_frequency(
-        input_signal,
-        sample_rate,
+    processed_signal = render(
         initial_expander_threshold,
         initial_compressor_threshold,
         initial_compressor_ratio,
-        initial_expander_ratio,
-        target_freq_range
+        initial_expander_ratio
     )
 
-    # Ensure processed signal length matches input
-    if len(processed_signal) > len(t):
-        processed_signal = processed_signal[:len(t)]
-    elif len(processed_signal) < len(t):
-        processed_signal = np.pad(processed_signal, (0, len(t) - len(processed_signal)), mode='constant')
-
     # Create figure and GridSpec layout
     fig = plt.figure(figsize=(15, 15))
     gs = GridSpec(3, 2, height_ratios=[1, 1, 0.4], figure=fig)
@@ -107,25 +567,25 @@ def interactive_audio_processor():
     slider_area = fig.add_subplot(gs[2, :])
     slider_area.set_visible(False)
 
-    # Time-domain plot
-    ax1.plot(t, input_signal, label="Original Signal", alpha=0.6)
-    time_processed_line, = ax1.plot(t, processed_signal, label="Processed Signal", linewidth=2)
+    # Time-domain plot. The waveforms are drawn as per-pixel min/max
+    # envelopes, recomputed for the visible range when zooming.
+    WaveformLine(ax1, input_signal, sample_rate, label="Original Signal", alpha=0.6)
+    processed_waveform = WaveformLine(ax1, processed_signal, sample_rate, label="Processed Signal", linewidth=2)
+    time_processed_line = processed_waveform.line
+    ax1.set_xlim(0, processed_waveform.duration)
     ax1.set_title("Time Domain Signal")
     ax1.set_xlabel("Time (s)")
     ax1.set_ylabel("Amplitude")
-    ax1.legend()
+    ax1.legend(loc='lower right')
     ax1.grid(True)
 
-    # Frequency domain plot setup
-    def plot_spectrum(signal):
-        spectrum = np.fft.rfft(signal)
-        freqs = np.fft.rfftfreq(len(signal), 1/sample_rate)
-        magnitude_db = 20 * np.log10(np.abs(spectrum) + 1e-10)
-        return freqs, magnitude_db
+    # Frequency domain plot setup. 1/24-octave bands give a few hundred
+    # points on the log axis instead of one per FFT bin.
+    analyzer = SpectrumAnalyzer(sample_rate, bins_per_octave=24)
 
     # Initial spectrum plots
-    freqs_orig, mag_db_orig = plot_spectrum(input_signal)
-    freqs_proc, mag_db_proc = plot_spectrum(processed_signal)
+    freqs_orig, mag_db_orig = analyzer.analyze(input_signal)
+    freqs_proc, mag_db_proc = analyzer.analyze(processed_signal)
     
     ax2.plot(freqs_orig, mag_db_orig, label="Original Spectrum", alpha=0.6)
     spectrum_line, = ax2.plot(freqs_proc, mag_db_proc, label="Processed Spectrum", linewidth=2)
@@ -138,15 +598,15 @@ def interactive_audio_processor():
     ax2.set_xscale('log')
     ax2.set_xlim(20, sample_rate/2)
     ax2.grid(True)
-    ax2.legend()
+    ax2.legend(loc='upper left')
 
     # Transfer function plot
     input_db = np.linspace(-60, 0, 1000)
     output_db = apply_expander_compressor(
         input_db,
-        initial_expander_threshold,
         initial_compressor_threshold,
         initial_compressor_ratio,
+        initial_expander_threshold,
         initial_expander_ratio
     )
 
@@ -163,7 +623,7 @@ def interactive_audio_processor():
     ax3.set_title('Compressor/Expander Transfer Function')
     ax3.set_xlabel('Input Level (dB)')
     ax3.set_ylabel('Output Level (dB)')
-    ax3.legend()
+    ax3.legend(loc='lower right')
     ax3.set_xlim(-60, 0)
     ax3.set_ylim(-60, 0)
     ax3.axis('square')
@@ -185,69 +645,83 @@ def interactive_audio_processor():
     compressor_ratio_slider = Slider(ax_compressor_ratio, 'Compressor Ratio', 1, 20, valinit=initial_compressor_ratio)
     expander_ratio_slider = Slider(ax_expander_ratio, 'Expander Ratio', 1, 10, valinit=initial_expander_ratio)
 
-    # Update function
-    def update(val):
-        expander_threshold = expander_threshold_slider.val
-        compressor_threshold = compressor_threshold_slider.val
-        compressor_ratio = compressor_ratio_slider.val
-        expander_ratio = expander_ratio_slider.val
-
-        # Update processed signal
-        processed_signal = apply_compression_expansion_frequency(
-            input_signal,
-            sample_rate,
-            expander_threshold,
-            compressor_threshold,
-            compressor_ratio,
-            expander_ratio,
-            target_freq_range
-        )
+    def compute(params):
+        expander_threshold, compressor_threshold, compressor_ratio, expander_ratio = params
+        with profiler.stage('band_ui.dsp'):
+            # Update processed signal
+            processed_signal = render(
+                expander_threshold,
+                compressor_threshold,
+                compressor_ratio,
+                expander_ratio
+            )
+            freqs_proc, mag_db_proc = analyzer.analyze(processed_signal)
+
+            # Update transfer function
+            output_db = apply_expander_compressor(
+                input_db,
+                compressor_threshold,
+                compressor_ratio,
+                expander_threshold,
+                expander_ratio
+            )
+        return MinMaxPyramid(processed_signal), mag_db_proc, output_db
+
+    def show(params, result):
+        expander_threshold, compressor_threshold, _, _ = params
+        processed_pyramid, mag_db_proc, output_db = result
+
+        with profiler.stage('band_ui.set_ydata'):
+            # Update time domain plot
+            processed_waveform.set_signal(processed_pyramid)
+
+            # Update frequency domain plot
+            spectrum_line.set_ydata(mag_db_proc)
+
+            combined_line.set_ydata(output_db)
+
+            # Update threshold lines
+            expander_threshold_line_x.set_xdata([expander_threshold, expander_threshold])
+            expander_threshold_line_y.set_ydata([expander_threshold, expander_threshold])
+            compressor_threshold_line_x.set_xdata([compressor_threshold, compressor_threshold])
+            compressor_threshold_line_y.set_ydata([compressor_threshold, compressor_threshold])
+
+    # Only the processed curves, threshold lines and slider parts change;
+    # everything else is drawn once and blitted from a cached background
+    # The legends are redrawn after the lines to stay on top of them
+    plot_artists = [time_processed_line, spectrum_line, combined_line,
+                    expander_threshold_line_x, expander_threshold_line_y,
+                    compressor_threshold_line_x, compressor_threshold_line_y,
+                    ax1.get_legend(), ax2.get_legend(), ax3.get_legend()]
+    blit = BlitManager(fig.canvas, plot_artists)
+    sliders = [compressor_threshold_slider, compressor_ratio_slider, expander_threshold_slider, expander_ratio_slider]
+    slider_artists = {slider: blit.add_slider(slider) for slider in sliders}
+
+    # A render takes far longer than a slider event, so slider events only
+    # record the newest values and the DSP runs in the background
+    worker = DebouncedWorker(fig.canvas, compute, show, redraw=lambda: blit.update(plot_artists))
 
-        # Ensure processed signal length matches input
-        if len(processed_signal) > len(t):
-            processed_signal = processed_signal[:len(t)]
-        elif len(processed_signal) < len(t):
-            processed_signal = np.pad(processed_signal, (0, len(t) - len(processed_signal)), mode='constant')
-
-        # Update time domain plot
-        time_processed_line.set_ydata(processed_signal)
-        
-        # Update frequency domain plot
-        freqs_proc, mag_db_proc = plot_spectrum(processed_signal)
-        spectrum_line.set_ydata(mag_db_proc)
-
-        # Update transfer function
-        output_db = apply_expander_compressor(
-            input_db,
-            expander_threshold,
-            compressor_threshold,
-            compressor_ratio,
-            expander_ratio
-        )
-        combined_line.set_ydata(output_db)
-
-        # Update threshold lines
-        expander_threshold_line_x.set_xdata([expander_threshold, expander_threshold])
-        expander_threshold_line_y.set_ydata([expander_threshold, expander_threshold])
-        compressor_threshold_line_x.set_xdata([compressor_threshold, compressor_threshold])
-        compressor_threshold_line_y.set_ydata([compressor_threshold, compressor_threshold])
-        
-        fig.canvas.draw_idle()
+    # Update function
+    @profiler.timed('band_ui.update')
+    def update(slider):
+        worker.submit((expander_threshold_slider.val, compressor_threshold_slider.val,
+                       compressor_ratio_slider.val, expander_ratio_slider.val))
+        # Move the slider itself right away
+        blit.update(slider_artists[slider])
 
     # Connect sliders to update function
-    expander_threshold_slider.on_changed(update)
-    compressor_threshold_slider.on_changed(update)
-    compressor_ratio_slider.on_changed(update)
-    expander_ratio_slider.on_changed(update)
+    for slider in sliders:
+        slider.on_changed(lambda _, slider=slider: update(slider))
 
     # Adjust layout
     #plt.tight_layout()
     #plt.subplots_adjust(top=0.95, bottom=0.2)
     plt.subplots_adjust(top=0.95, bottom=0.2, hspace=0.5)
 
+    profiler.instrument_canvas(fig.canvas, 'band_ui.draw')
     plt.show()
 
 
-
 # Run the interactive expander/compressor
-interactive_audio_processor()
+if __name__ == "__main__":
+    interactive_audio_processor()